@@ -2,6 +2,8 @@ import streamlit as st
 import firebase_admin
 from firebase_admin import credentials, firestore
 
+from core import background
+
 st.set_page_config(
     page_title="FashN8",
     page_icon="🔥",
@@ -27,6 +29,9 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+# --- Warm the shared background-removal model once per server process ---
+background.preload()
+
 # --- Firebase initialization ---
 try:
     if not firebase_admin._apps:
@@ -130,6 +135,7 @@ if not st.session_state.get('authentication_status'):
                             'email': email,
                             'shirts': {},  # Initialize empty map for shirts
                             'pant': {},    # Initialize empty map for pants (matching your DB key 'pant')
+                            'counters': {'shirts': 0, 'pant': 0},  # Last item id handed out per map; never reused
                             'week': {      # Initialize the weekly planner with empty slots
                                 'monday': {'pant': '', 'shirt': ''},
                                 'tuesday': {'pant': '', 'shirt': ''},
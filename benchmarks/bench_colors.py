@@ -0,0 +1,91 @@
+"""Benchmark the shared dominant-color engine against the old per-page code.
+
+Run from the project root:
+
+    python -m benchmarks.bench_colors --width 4000 --height 3000
+"""
+import argparse
+import time
+from collections import Counter
+
+import numpy as np
+from PIL import Image
+
+from core.colors import dominant_rgb, rgb_to_hex
+
+
+def legacy_dress_color(image_rgba, alpha_threshold=30, min_brightness=20):
+    """The Counter-over-tuples implementation previously in pages/1_Dress++.py."""
+    data = np.array(image_rgba)
+    r, g, b, a = data[:, :, 0], data[:, :, 1], data[:, :, 2], data[:, :, 3]
+    brightness = 0.299 * r + 0.587 * g + 0.114 * b
+    mask = (a > alpha_threshold) & (brightness > min_brightness)
+    if np.count_nonzero(mask) == 0:
+        return "#000000"
+    filtered_pixels = data[mask]
+    rgb_values = [tuple(pixel[:3]) for pixel in filtered_pixels]
+    most_common = Counter(rgb_values).most_common(1)[0][0]
+    return '#%02x%02x%02x' % most_common
+
+
+def legacy_tryon_color(image):
+    """The random-sampling implementation previously in pages/3_Virtual TryOn.py."""
+    img = image.convert('RGB').resize((150, 150))
+    pixels = np.array(img).reshape(-1, 3)
+    rgb = pixels[np.random.choice(pixels.shape[0], 5000, replace=True)]
+    return Counter(map(tuple, rgb)).most_common(1)[0][0]
+
+
+def synthetic_garment(width, height, seed=0):
+    """A noisy navy garment on a transparent background, like a rembg cut-out."""
+    rng = np.random.default_rng(seed)
+    data = np.zeros((height, width, 4), dtype=np.uint8)
+    y0, y1 = height // 6, height - height // 6
+    x0, x1 = width // 5, width - width // 5
+    base = np.array([30, 45, 81], dtype=np.int16)
+    noise = rng.integers(-6, 7, size=(y1 - y0, x1 - x0, 3), dtype=np.int16)
+    data[y0:y1, x0:x1, :3] = np.clip(base + noise, 0, 255).astype(np.uint8)
+    data[y0:y1, x0:x1, 3] = 255
+    # A lighter stripe pattern so the histogram is not trivially unimodal.
+    data[y0:y1:12, x0:x1, :3] = (200, 200, 205)
+    return Image.fromarray(data, "RGBA")
+
+
+def timed(fn, *args, repeat=3, **kwargs):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    image = synthetic_garment(args.width, args.height)
+    print(f"Image: {args.width}x{args.height} ({args.width * args.height / 1e6:.1f} MP)")
+
+    rows = [
+        ("legacy Dress++ (Counter)", timed(legacy_dress_color, image, repeat=1)),
+        ("shared, 5-bit bincount", timed(lambda: rgb_to_hex(dominant_rgb(image)), repeat=args.repeat)),
+        ("shared, 8-bit unique", timed(lambda: rgb_to_hex(dominant_rgb(image, bits=8)), repeat=args.repeat)),
+        ("legacy TryOn (sampled)", timed(legacy_tryon_color, image, repeat=args.repeat)),
+        ("shared, max_side=256", timed(lambda: rgb_to_hex(dominant_rgb(image, max_side=256)), repeat=args.repeat)),
+    ]
+    for name, (seconds, result) in rows:
+        print(f"{name:<28} {seconds * 1000:>10.1f} ms   {result}")
+
+    runs = {legacy_tryon_color(image) for _ in range(5)}
+    print(f"legacy TryOn distinct results over 5 runs: {len(runs)}")
+    runs = {dominant_rgb(image, max_side=256) for _ in range(5)}
+    print(f"shared engine distinct results over 5 runs: {len(runs)}")
+
+
+if __name__ == "__main__":
+    main()
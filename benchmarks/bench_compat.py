@@ -0,0 +1,96 @@
+"""Benchmark incremental compatibility-matrix updates against full rebuilds.
+
+For growing wardrobes (N shirts x N pants) times adding one shirt, adding
+one pant and deleting one item, each including its persistence (one log
+append), versus scoring the whole matrix again. Also times the full snapshot
+that compaction writes once per FASHN8_COMPAT_LOG_MAX_OPS changes, the
+resulting amortized cost per change, and one "Plan my week" solve:
+
+    python -m benchmarks.bench_compat --sizes 100 500 1000 2000 4000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from core import config
+from core.compat import CompatibilityMatrix
+from core.harmony import hex_to_lab, score_pairs
+from core.planner import plan_week
+
+
+def random_hexes(rng, n):
+    return ["#%06x" % v for v in rng.integers(0, 1 << 24, size=n)]
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000, 2000, 4000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    workdir = tempfile.mkdtemp(prefix="bench_compat_")
+    # Huge log limit so the per-change columns time log appends; compaction is timed separately
+    never_compact = 10 ** 9
+    print(
+        f"{'items/side':>10} {'add shirt':>12} {'add pant':>12} {'delete':>12} {'snapshot':>12} "
+        f"{'amortized':>12} {'full rebuild':>14} {'plan week':>12}"
+    )
+    for n in args.sizes:
+        shirt_hex, pant_hex = random_hexes(rng, n), random_hexes(rng, n)
+        shirt_lab, pant_lab = hex_to_lab(shirt_hex), hex_to_lab(pant_hex)
+        scores, reasons = score_pairs(shirt_lab, pant_lab)
+        matrix = CompatibilityMatrix(
+            [str(i) for i in range(n)], [str(i) for i in range(n)], shirt_lab, pant_lab, scores, reasons
+        )
+
+        path = os.path.join(workdir, "%d.npz" % n)
+        matrix.save(path)
+        counter = iter(range(10 ** 9))
+
+        def add_shirt():
+            matrix.add("shirts", "new%d" % next(counter), random_hexes(rng, 1)[0])
+            matrix.persist(path, never_compact)
+
+        def add_pant():
+            matrix.add("pants", "new%d" % next(counter), random_hexes(rng, 1)[0])
+            matrix.persist(path, never_compact)
+
+        def delete():
+            matrix.remove("shirts", matrix.axes["shirts"].ids[0])
+            matrix.persist(path, never_compact)
+
+        def snapshot():
+            matrix.save(path)
+
+        def rebuild():
+            score_pairs(hex_to_lab(shirt_hex), hex_to_lab(pant_hex))
+
+        def plan():
+            plan_week(matrix)
+
+        times = [best_of(fn, args.repeat) for fn in (add_shirt, add_pant, delete, snapshot, rebuild, plan)]
+        amortized = max(times[:3]) + times[3] / config.COMPAT_LOG_MAX_OPS
+        print(
+            f"{n:>10} " + " ".join(f"{t * 1000:>10.3f}ms" for t in times[:3])
+            + f" {times[3] * 1000:>10.1f}ms {amortized * 1000:>10.3f}ms"
+            + f" {times[4] * 1000:>12.1f}ms {times[5] * 1000:>10.1f}ms"
+        )
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
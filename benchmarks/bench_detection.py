@@ -0,0 +1,43 @@
+"""Benchmark the apparel-detection stage offline with the local stand-in backend.
+
+Compares one predict call per image (the old per-upload pattern) against a
+single batched call, using simulated per-call and per-image latencies:
+
+    python -m benchmarks.bench_detection --images 16 --call-ms 250 --image-ms 40
+"""
+import argparse
+import time
+
+from core.detection import ApparelDetector, LocalBackend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--call-ms", type=float, default=250.0, help="simulated round trip + setup per predict call")
+    parser.add_argument("--image-ms", type=float, default=40.0, help="simulated inference per image")
+    args = parser.parse_args()
+
+    images = [b"image-%d" % n for n in range(args.images)]
+
+    backend = LocalBackend(call_latency=args.call_ms / 1000, image_latency=args.image_ms / 1000)
+    detector = ApparelDetector(backend)
+
+    start = time.perf_counter()
+    for image_bytes in images:
+        detector.detect(image_bytes)
+    sequential = time.perf_counter() - start
+    sequential_calls = backend.calls
+
+    backend.calls = 0
+    start = time.perf_counter()
+    detector.detect_many(images)
+    batched = time.perf_counter() - start
+
+    print(f"{args.images} images")
+    print(f"one call per image: {sequential * 1000:8.1f} ms  ({sequential_calls} predict calls)")
+    print(f"batched:            {batched * 1000:8.1f} ms  ({backend.calls} predict calls)")
+
+
+if __name__ == "__main__":
+    main()
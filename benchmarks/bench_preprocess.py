@@ -0,0 +1,115 @@
+"""Benchmark upload normalization: full-size PNG payload vs bounded JPEG payload.
+
+Measures local latency for decode/encode, matting (if rembg is installed),
+a simulated detection round trip and the dominant-color step, plus the bytes
+sent over the wire to the detector:
+
+    python -m benchmarks.bench_preprocess --width 4000 --height 3000 --mbps 20
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from core.colors import get_dominant_color
+from core.detection import ApparelDetector, LocalBackend
+from core.preprocess import apply_matte, box_to_pixels, prepare_image
+
+
+def synthetic_photo(width, height, seed=0):
+    """JPEG bytes for a phone-like photo: smooth gradients plus sensor noise."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([
+        120 + 80 * np.sin(x / width * 3.0),
+        90 + 60 * np.cos(y / height * 2.0),
+        140 + 50 * np.sin((x + y) / (width + height) * 4.0),
+    ], axis=-1)
+    noise = rng.normal(0, 6, size=base.shape)
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def load_rembg():
+    try:
+        from core.background import remove_background
+        return remove_background
+    except Exception:
+        return None
+
+
+def legacy_pipeline(upload, detector, remove_background, mbps):
+    timings = {}
+    start = time.perf_counter()
+    original = Image.open(io.BytesIO(upload)).convert("RGB")
+    buffer = io.BytesIO()
+    original.save(buffer, format="PNG")
+    payload = buffer.getvalue()
+    timings["decode+encode"] = time.perf_counter() - start
+
+    timings["wire"] = len(payload) * 8 / (mbps * 1e6)
+    start = time.perf_counter()
+    regions = detector.detect(payload)
+    timings["detect"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cutout = remove_background(payload) if remove_background else original.convert("RGBA")
+    timings["matting"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for region in regions:
+        get_dominant_color(cutout.crop(box_to_pixels(region["box"], *original.size)))
+    timings["crop+color"] = time.perf_counter() - start
+    return len(payload), timings
+
+
+def prepared_pipeline(upload, detector, remove_background, mbps):
+    timings = {}
+    start = time.perf_counter()
+    prepared = prepare_image(upload)
+    timings["decode+encode"] = time.perf_counter() - start
+
+    timings["wire"] = len(prepared.payload) * 8 / (mbps * 1e6)
+    start = time.perf_counter()
+    regions = detector.detect(prepared.payload)
+    timings["detect"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matte = remove_background(prepared.payload) if remove_background else prepared.work.convert("RGBA")
+    cutout = apply_matte(prepared.original, matte)
+    timings["matting"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for region in regions:
+        get_dominant_color(cutout.crop(box_to_pixels(region["box"], *prepared.original.size)))
+    timings["crop+color"] = time.perf_counter() - start
+    return len(prepared.payload), timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--mbps", type=float, default=20.0, help="simulated uplink to the detector")
+    parser.add_argument("--no-rembg", action="store_true", help="skip matting even if rembg is installed")
+    args = parser.parse_args()
+
+    upload = synthetic_photo(args.width, args.height)
+    detector = ApparelDetector(LocalBackend())
+    remove_background = None if args.no_rembg else load_rembg()
+    print(f"Upload: {args.width}x{args.height} JPEG, {len(upload) / 1e6:.2f} MB; "
+          f"rembg {'enabled' if remove_background else 'not available (matting skipped)'}")
+
+    for name, run in (("full-size PNG", legacy_pipeline), ("prepared JPEG", prepared_pipeline)):
+        size, timings = run(upload, detector, remove_background, args.mbps)
+        total = sum(timings.values())
+        stages = "  ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in timings.items())
+        print(f"{name:<14} payload {size / 1e6:6.2f} MB  total {total * 1000:7.0f} ms  | {stages}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Shared engines used by the FashN8 Streamlit pages."""
@@ -0,0 +1,92 @@
+"""Process-wide, pre-warmed rembg background-removal service.
+
+Streamlit re-executes page scripts on every interaction, but imported modules
+live for the whole server process. Keeping the ONNX sessions here means each
+model is loaded once and shared by every page and every user session.
+"""
+import io
+import logging
+import threading
+
+import onnxruntime as ort
+from PIL import Image
+from rembg import new_session, remove
+from rembg.sessions import sessions_class
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+_sessions = {}
+_lock = threading.Lock()
+_preloaded = False
+
+
+def _session_options(intra_op_threads, inter_op_threads):
+    opts = ort.SessionOptions()
+    if intra_op_threads:
+        opts.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        opts.inter_op_num_threads = inter_op_threads
+    return opts
+
+
+def _create_session(model_name, intra_op_threads, inter_op_threads):
+    session_class = next((sc for sc in sessions_class if sc.name() == model_name), None)
+    if session_class is None or not (intra_op_threads or inter_op_threads):
+        return new_session(model_name)
+    # new_session() only honours OMP_NUM_THREADS, so build the options ourselves.
+    return session_class(model_name, _session_options(intra_op_threads, inter_op_threads))
+
+
+def _warmup(session):
+    """Run one tiny inference so the first real request doesn't pay for graph init."""
+    remove(Image.new("RGB", (64, 64), (127, 127, 127)), session=session)
+
+
+def get_session(model_name=None):
+    """Return the shared rembg session for `model_name`, creating and warming it once."""
+    model_name = model_name or config.REMBG_MODEL
+    session = _sessions.get(model_name)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(model_name)
+        if session is None:
+            session = _create_session(
+                model_name, config.ORT_INTRA_OP_THREADS, config.ORT_INTER_OP_THREADS
+            )
+            _warmup(session)
+            _sessions[model_name] = session
+    return session
+
+
+def preload(model_names=None, background=True):
+    """Create and warm sessions at server start; runs in a daemon thread by default.
+
+    Safe to call on every script run: only the first call per process does work.
+    """
+    global _preloaded
+    with _lock:
+        if _preloaded:
+            return
+        _preloaded = True
+    names = model_names or [config.REMBG_MODEL]
+
+    def _load():
+        for name in names:
+            try:
+                get_session(name)
+            except Exception:
+                logger.exception("Failed to preload rembg model %r", name)
+
+    if background:
+        threading.Thread(target=_load, name="rembg-preload", daemon=True).start()
+    else:
+        _load()
+
+
+def remove_background(image_bytes, model_name=None):
+    """Remove the background from encoded image bytes and return an RGBA PIL image."""
+    output_bytes = remove(image_bytes, session=get_session(model_name))
+    return Image.open(io.BytesIO(output_bytes)).convert("RGBA")
@@ -0,0 +1,213 @@
+"""Content-addressed two-tier cache with single-flight computation.
+
+Values live in a per-process LRU first and in a size-bounded directory second.
+Keys are namespaced SHA-256 digests, so identical inputs from different users
+or sessions share one entry, and concurrent misses for the same key share one
+computation instead of racing.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def content_key(*parts):
+    """SHA-256 hex digest over one or more bytes/str parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class PipelineCache:
+    def __init__(self, directory, max_memory_items=256, max_disk_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "shared": 0}
+
+    # --- memory tier ---
+    def _memory_get(self, full_key):
+        with self._lock:
+            if full_key in self._memory:
+                self._memory.move_to_end(full_key)
+                return self._memory[full_key]
+        return _MISSING
+
+    def _memory_set(self, full_key, value):
+        with self._lock:
+            self._memory[full_key] = value
+            self._memory.move_to_end(full_key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    # --- disk tier ---
+    def _path(self, namespace, key):
+        return os.path.join(self.directory, namespace, key[:2], key + ".pkl")
+
+    def _disk_get(self, namespace, key):
+        path = self._path(namespace, key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return _MISSING
+        except Exception:
+            logger.warning("Dropping unreadable cache entry %s", path)
+            self._remove(path)
+            return _MISSING
+        try:
+            os.utime(path)  # mtime doubles as the LRU clock for eviction
+        except OSError:
+            pass
+        return value
+
+    def _disk_set(self, namespace, key, value):
+        path = self._path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+        with self._disk_lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += size
+        self._evict_if_needed()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict_if_needed(self):
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._scan())
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+            # Evict least-recently-used files down to 90% so we don't rescan on every write.
+            target = int(self.max_disk_bytes * 0.9)
+            entries = sorted(self._scan())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+            self._disk_bytes = total
+
+    def _count(self, name):
+        # Many threads read the cache at once; unlocked `+=` would lose counts.
+        with self._lock:
+            self.stats[name] += 1
+
+    # --- public API ---
+    def get(self, namespace, key, default=None):
+        full_key = (namespace, key)
+        value = self._memory_get(full_key)
+        if value is not _MISSING:
+            self._count("memory_hits")
+            return value
+        value = self._disk_get(namespace, key)
+        if value is not _MISSING:
+            self._count("disk_hits")
+            self._memory_set(full_key, value)
+            return value
+        return default
+
+    def set(self, namespace, key, value):
+        self._memory_set((namespace, key), value)
+        try:
+            self._disk_set(namespace, key, value)
+        except Exception:
+            logger.exception("Could not persist cache entry %s/%s", namespace, key)
+
+    def get_or_compute(self, namespace, key, compute):
+        """Return the cached value, or run `compute()` once even under concurrent callers."""
+        value = self.get(namespace, key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        full_key = (namespace, key)
+        with self._lock:
+            future = self._inflight.get(full_key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[full_key] = future
+            else:
+                self.stats["shared"] += 1
+        if not owner:
+            return future.result()
+
+        try:
+            # Another caller may have finished between our miss and taking ownership.
+            value = self.get(namespace, key, _MISSING)
+            if value is _MISSING:
+                self._count("misses")
+                value = compute()
+                self.set(namespace, key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(full_key, None)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide pipeline cache."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = PipelineCache(
+                    os.path.join(config.CACHE_DIR, "pipeline"),
+                    max_memory_items=config.CACHE_MEMORY_ITEMS,
+                    max_disk_bytes=config.CACHE_DISK_MB * 1024 * 1024,
+                )
+    return _shared
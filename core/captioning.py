@@ -0,0 +1,141 @@
+"""Pooled, instrumented Gradio caption client for garment crops.
+
+`Client(space)` downloads the Space config and opens a session, which used
+to happen on every caption. The pool creates at most `size` clients per
+process and hands them out one caller at a time. Crops are uploaded straight
+from memory. Every call records how its latency splits between client setup,
+upload and inference.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from gradio_client import Client
+
+from core import config
+from core.gradio_io import TempFileHandle, encode_image, upload_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class CaptionClientPool:
+    def __init__(self, space, size=4, timeout=60):
+        self.space = space
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._created = 0
+        # Signalled whenever a client goes back to the pool or a slot is freed.
+        self._available = threading.Condition()
+        self.timings = deque(maxlen=200)
+
+    def _acquire(self):
+        """Return (client, setup_seconds); waits if all clients are busy."""
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        with self._available:
+            while not self._idle and self._created >= self.size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise TimeoutError("All caption clients are busy")
+                self._available.wait(remaining)
+            if self._idle:
+                return self._idle.pop(), time.perf_counter() - start
+            self._created += 1
+        try:
+            client = Client(self.space, verbose=False)
+        except Exception:
+            self._free_slot()
+            raise
+        return client, time.perf_counter() - start
+
+    def _release(self, client):
+        with self._available:
+            self._idle.append(client)
+            self._available.notify()
+
+    def _free_slot(self):
+        # Wakes a waiting caller so it can create a replacement client.
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _discard(self, client):
+        """Close a client that failed and free its slot in the pool."""
+        self._free_slot()
+        # Stops the heartbeat thread and the HTTP session instead of leaving them until GC.
+        close = getattr(client, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                logger.debug("Closing a discarded caption client failed", exc_info=True)
+
+    def caption(self, image, timeout=None):
+        """Caption a PIL image; raises TimeoutError if the Space doesn't answer in time."""
+        timeout = timeout or self.timeout
+        client, setup = self._acquire()
+        healthy = False
+        try:
+            data = encode_image(image.convert("RGB"), "PNG")
+            with ExitStack() as stack:
+                start = time.perf_counter()
+                try:
+                    image_ref = upload_bytes(client, data, "crop.png")
+                except Exception:
+                    logger.warning("In-memory upload failed; falling back to a temp file", exc_info=True)
+                    image_ref = stack.enter_context(TempFileHandle(data, ".png"))
+                upload = time.perf_counter() - start
+
+                start = time.perf_counter()
+                job = client.submit(image=image_ref, api_name="/predict")
+                try:
+                    text = job.result(timeout=timeout)
+                except FutureTimeout:
+                    job.cancel()
+                    raise TimeoutError(f"Caption request timed out after {timeout}s")
+                inference = time.perf_counter() - start
+
+            self.timings.append({"setup": setup, "upload": upload, "inference": inference})
+            healthy = True
+            return text
+        finally:
+            if healthy:
+                self._release(client)
+            else:
+                # Don't hand a client in an unknown state to the next caller.
+                self._discard(client)
+
+    def stats(self):
+        """Mean seconds spent in each phase over the recent calls."""
+        timings = list(self.timings)
+        if not timings:
+            return {"calls": 0, "setup": 0.0, "upload": 0.0, "inference": 0.0}
+        n = len(timings)
+        return {
+            "calls": n,
+            **{phase: sum(t[phase] for t in timings) / n for phase in ("setup", "upload", "inference")},
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_caption_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = CaptionClientPool(
+                    config.CAPTION_SPACE, config.CAPTION_POOL_SIZE, config.CAPTION_TIMEOUT_S
+                )
+    return _pool
+
+
+def caption_image(image, timeout=None):
+    """Caption a PIL crop with the shared client pool."""
+    return get_caption_pool().caption(image, timeout=timeout)
@@ -0,0 +1,117 @@
+"""Fast batch scorer for pairs of garment colors.
+
+A small NumPy MLP scores (top, bottom) color pairs in [0, 1]. Features are
+computed for whole arrays of pairs at once: CIELAB lightness and chroma of
+both pieces, their differences, hue-difference harmonics and CIELAB ΔE. One
+`predict` call therefore scores thousands of pairs with a few matrix
+multiplies, and the output is deterministic.
+
+The bundled weights (`core/models/color_compat.npz`, produced by
+`python -m scripts.train_color_model`) are distilled from the core.harmony
+rules. No human preference labels were used. The model is a faster stand-in
+for those rules, not a model of real taste. Retraining with `--labels` on
+human ratings is what would change that.
+"""
+import os
+import threading
+
+import numpy as np
+
+from core.harmony import rgb_to_lab
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "models", "color_compat.npz")
+
+FEATURES = (
+    "L_top", "L_bottom", "chroma_top", "chroma_bottom", "chroma_min", "chroma_max",
+    "dL", "delta_e", "dh", "cos_dh", "cos_2dh", "cos_3dh", "sin_dh",
+)
+
+
+def pair_features(lab_a, lab_b):
+    """(N, len(FEATURES)) features for the row-aligned pairs of two (N, 3) CIELAB arrays."""
+    lab_a, lab_b = np.asarray(lab_a, dtype=np.float64), np.asarray(lab_b, dtype=np.float64)
+    c1, c2 = np.hypot(lab_a[:, 1], lab_a[:, 2]), np.hypot(lab_b[:, 1], lab_b[:, 2])
+    h1, h2 = np.arctan2(lab_a[:, 2], lab_a[:, 1]), np.arctan2(lab_b[:, 2], lab_b[:, 1])
+    dh = np.abs(h1 - h2) % (2 * np.pi)
+    dh = np.minimum(dh, 2 * np.pi - dh)
+    return np.stack([
+        lab_a[:, 0] / 100, lab_b[:, 0] / 100,
+        c1 / 100, c2 / 100, np.minimum(c1, c2) / 100, np.maximum(c1, c2) / 100,
+        np.abs(lab_a[:, 0] - lab_b[:, 0]) / 100,
+        np.linalg.norm(lab_a - lab_b, axis=1) / 100,
+        dh / np.pi, np.cos(dh), np.cos(2 * dh), np.cos(3 * dh), np.sin(dh),
+    ], axis=1)
+
+
+class ColorCompatModel:
+    """Feature standardization plus a tanh MLP with a sigmoid output."""
+
+    def __init__(self, mean, std, weights, biases, meta=None):
+        self.mean = np.asarray(mean)
+        self.std = np.asarray(std)
+        self.weights = [np.asarray(w) for w in weights]
+        self.biases = [np.asarray(b) for b in biases]
+        self.meta = dict(meta or {})
+
+    def _forward(self, x):
+        h = (x - self.mean) / self.std
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            h = np.tanh(h @ w + b)
+        return 1 / (1 + np.exp(-(h @ self.weights[-1] + self.biases[-1])[:, 0]))
+
+    def predict(self, lab_a, lab_b, batch_size=65536):
+        """Compatibility in [0, 1] for each row-aligned pair of CIELAB colors."""
+        n = len(lab_a)
+        out = np.empty(n, dtype=np.float32)
+        for start in range(0, n, batch_size):
+            stop = start + batch_size
+            out[start:stop] = self._forward(pair_features(lab_a[start:stop], lab_b[start:stop]))
+        return out
+
+    def predict_rgb(self, rgb_a, rgb_b):
+        """Pairs of 0-255 RGB triples."""
+        return self.predict(
+            rgb_to_lab(np.asarray(rgb_a, dtype=np.float64).reshape(-1, 3) / 255),
+            rgb_to_lab(np.asarray(rgb_b, dtype=np.float64).reshape(-1, 3) / 255),
+        )
+
+    @staticmethod
+    def to_rating(scores):
+        """Map [0, 1] scores onto the app's 1.0-5.0 star scale, one decimal."""
+        return np.round(1 + 4 * np.clip(scores, 0, 1), 1)
+
+    # --- persistence ---
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        arrays = {"mean": self.mean, "std": self.std, "layers": np.array(len(self.weights))}
+        for n, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"w{n}"], arrays[f"b{n}"] = w, b
+        for key, value in self.meta.items():
+            arrays[f"meta_{key}"] = np.array(value)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with np.load(path) as data:
+            layers = int(data["layers"])
+            meta = {key[5:]: data[key].item() for key in data.files if key.startswith("meta_")}
+            return cls(
+                data["mean"], data["std"],
+                [data[f"w{n}"] for n in range(layers)],
+                [data[f"b{n}"] for n in range(layers)],
+                meta,
+            )
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_color_model():
+    """The bundled model, loaded once per process."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = ColorCompatModel.load(MODEL_PATH)
+    return _model
@@ -0,0 +1,77 @@
+"""Vectorized dominant-color extraction shared by the Streamlit pages."""
+import numpy as np
+from PIL import Image
+
+# Bits kept per channel before histogramming; 5 bits -> 32 levels -> 32768 bins.
+DEFAULT_BITS = 5
+
+
+def _to_rgba_array(image):
+    """Return an (H, W, 4) uint8 array for a PIL image, path or array."""
+    if isinstance(image, np.ndarray):
+        data = image
+    else:
+        if not isinstance(image, Image.Image):
+            image = Image.open(image)
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+        data = np.asarray(image)
+    if data.ndim == 3 and data.shape[2] == 3:
+        alpha = np.full(data.shape[:2] + (1,), 255, dtype=np.uint8)
+        data = np.concatenate([data, alpha], axis=2)
+    return data
+
+
+def pack_rgb(rgb, bits=8):
+    """Pack an (N, 3) uint8 array into integer color codes after quantizing to `bits`."""
+    shift = 8 - bits
+    q = (rgb >> shift).astype(np.uint32)
+    return (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+
+
+def dominant_rgb(image, alpha_threshold=30, min_brightness=20, bits=DEFAULT_BITS, max_side=None):
+    """Return the dominant (r, g, b) of the visible pixels, or None if nothing is visible.
+
+    Pixels are masked by alpha and brightness, quantized to `bits` per channel and
+    counted with a single `bincount`. The returned color is the mean of the pixels
+    in the winning bin, so it stays close to the real garment color. Ties resolve
+    to the lowest bin, which keeps the output deterministic.
+    """
+    if max_side and not isinstance(image, np.ndarray):
+        if not isinstance(image, Image.Image):
+            image = Image.open(image)
+        if max(image.size) > max_side:
+            image = image.copy()
+            image.thumbnail((max_side, max_side), Image.NEAREST)
+
+    data = _to_rgba_array(image).reshape(-1, 4)
+    # Drop transparent pixels first; on rembg cut-outs that is most of the frame.
+    opaque = data[data[:, 3] > alpha_threshold]
+    # Integer Rec. 601 luma (x1000) avoids a float copy of every pixel.
+    luma = opaque[:, :3].astype(np.uint32) @ np.array([299, 587, 114], dtype=np.uint32)
+    visible = opaque[luma > min_brightness * 1000, :3]
+    if visible.shape[0] == 0:
+        return None
+
+    codes = pack_rgb(visible, bits)
+    if bits >= 8:
+        # 2**24 bins would be mostly empty; sort-based counting is cheaper here.
+        values, counts = np.unique(codes, return_counts=True)
+        winner = values[np.argmax(counts)]
+    else:
+        winner = np.argmax(np.bincount(codes, minlength=1 << (3 * bits)))
+
+    members = visible[codes == winner]
+    return tuple(int(round(c)) for c in members.mean(axis=0))
+
+
+def rgb_to_hex(rgb):
+    return "#%02x%02x%02x" % tuple(rgb)
+
+
+def get_dominant_color(image_rgba, alpha_threshold=30, min_brightness=20, bits=DEFAULT_BITS):
+    """Return (hex, status) for an RGBA crop, matching the old Dress++ contract."""
+    rgb = dominant_rgb(image_rgba, alpha_threshold, min_brightness, bits)
+    if rgb is None:
+        return "#000000", "No visible color"
+    return rgb_to_hex(rgb), "Dominant"
@@ -0,0 +1,297 @@
+"""Per-user shirt x pant compatibility matrix, maintained incrementally.
+
+The matrix is kept in memory per process, for the most recently used
+FASHN8_COMPAT_MAX_USERS users. Adding a garment scores one new row (shirt)
+or column (pant) against the other side. Removing one swaps the last
+row/column into its slot. Both cost O(other side), never a full rebuild.
+Best match, alternates and weekly planning then become lookups into the
+stored scores.
+
+Persistence follows the same rule. A full snapshot (`<user>.npz` under
+FASHN8_CACHE_DIR/compat) is written only now and then. Each add or remove
+in between appends one JSON line to `<user>.log` and is replayed on load.
+Replay is idempotent: adding an id that already exists re-scores it, and
+removing a missing id does nothing. A crash between a snapshot and the log
+truncation therefore only replays work that is already in the snapshot.
+Once the log holds FASHN8_COMPAT_LOG_MAX_OPS entries, the next change
+compacts it into a new snapshot. That O(N·M) write is spread over that
+many updates.
+"""
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+
+from core import config
+from core.harmony import REASONS, hex_to_lab, score_pairs
+
+SIDES = ("shirts", "pants")
+# Firestore map name for each side ('pant' matches the DB schema).
+FIRESTORE_MAPS = {"shirts": "shirts", "pants": "pant"}
+
+
+class _Axis:
+    """Ids, id->slot index and CIELAB rows for one side of the matrix."""
+
+    def __init__(self, ids=(), lab=None):
+        self.ids = list(ids)
+        self.index = {item_id: n for n, item_id in enumerate(self.ids)}
+        self.lab = np.zeros((max(len(self.ids), 8), 3))
+        if lab is not None and len(self.ids):
+            self.lab[:len(self.ids)] = lab
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class CompatibilityMatrix:
+    def __init__(self, shirt_ids=(), pant_ids=(), shirt_lab=None, pant_lab=None, scores=None, reasons=None):
+        self.axes = {"shirts": _Axis(shirt_ids, shirt_lab), "pants": _Axis(pant_ids, pant_lab)}
+        rows, cols = len(shirt_ids), len(pant_ids)
+        self._scores = np.zeros((max(rows, 8), max(cols, 8)), dtype=np.float32)
+        self._reasons = np.zeros(self._scores.shape, dtype=np.int8)
+        if scores is not None and rows and cols:
+            self._scores[:rows, :cols] = scores
+            self._reasons[:rows, :cols] = reasons
+        self.version = 0
+        # Changes not yet persisted, and changes already in the log on disk
+        self.pending = []
+        self.logged = 0
+
+    # --- views ---
+    @property
+    def scores(self):
+        return self._scores[:len(self.axes["shirts"]), :len(self.axes["pants"])]
+
+    @property
+    def reasons(self):
+        return self._reasons[:len(self.axes["shirts"]), :len(self.axes["pants"])]
+
+    def __contains__(self, key):
+        side, item_id = key
+        return item_id in self.axes[side].index
+
+    # --- incremental updates ---
+    def _grow(self, side):
+        axis = self.axes[side]
+        axis.lab = np.concatenate([axis.lab, np.zeros_like(axis.lab)])
+        pad = [(0, 0), (0, 0)]
+        pad[0 if side == "shirts" else 1] = (0, self._scores.shape[0 if side == "shirts" else 1])
+        self._scores = np.pad(self._scores, pad)
+        self._reasons = np.pad(self._reasons, pad)
+
+    def add(self, side, item_id, hex_value):
+        """Score one new (or re-colored) item against every item on the other side."""
+        axis = self.axes[side]
+        other = self.axes["pants" if side == "shirts" else "shirts"]
+        lab = hex_to_lab([hex_value])
+        slot = axis.index.get(item_id)
+        if slot is None:
+            if len(axis) == len(axis.lab):
+                self._grow(side)
+            slot = len(axis)
+            axis.ids.append(item_id)
+            axis.index[item_id] = slot
+        axis.lab[slot] = lab[0]
+
+        other_lab = other.lab[:len(other)]
+        if side == "shirts":
+            scores, reasons = score_pairs(lab, other_lab)
+            self._scores[slot, :len(other)] = scores[0]
+            self._reasons[slot, :len(other)] = reasons[0]
+        else:
+            scores, reasons = score_pairs(other_lab, lab)
+            self._scores[:len(other), slot] = scores[:, 0]
+            self._reasons[:len(other), slot] = reasons[:, 0]
+        self.version += 1
+        self.pending.append({"op": "add", "side": side, "id": item_id, "hex": hex_value})
+
+    def remove(self, side, item_id):
+        """Drop an item by moving the last row/column into its slot."""
+        axis = self.axes[side]
+        slot = axis.index.pop(item_id, None)
+        if slot is None:
+            return
+        last = len(axis) - 1
+        if slot != last:
+            moved = axis.ids[last]
+            axis.ids[slot] = moved
+            axis.index[moved] = slot
+            axis.lab[slot] = axis.lab[last]
+            if side == "shirts":
+                self._scores[slot] = self._scores[last]
+                self._reasons[slot] = self._reasons[last]
+            else:
+                self._scores[:, slot] = self._scores[:, last]
+                self._reasons[:, slot] = self._reasons[:, last]
+        axis.ids.pop()
+        self.version += 1
+        self.pending.append({"op": "remove", "side": side, "id": item_id})
+
+    def sync(self, shirts, pants):
+        """Reconcile with the Firestore maps: drop deleted ids and score new ones.
+
+        Returns True if anything changed.
+        """
+        before = self.version
+        for side, items in (("shirts", shirts), ("pants", pants)):
+            axis = self.axes[side]
+            for item_id in [i for i in axis.ids if i not in items]:
+                self.remove(side, item_id)
+            for item_id, item in items.items():
+                if item_id not in axis.index:
+                    self.add(side, item_id, item.get("hex"))
+        return self.version != before
+
+    # --- lookups ---
+    def ranked(self, side, item_id, k=None, exclude=()):
+        """[other_id, score, reason] for the best counterparts of one item, best first."""
+        axis = self.axes[side]
+        other = self.axes["pants" if side == "shirts" else "shirts"]
+        slot = axis.index.get(item_id)
+        if slot is None or not len(other):
+            return []
+        if side == "shirts":
+            scores, reasons = self.scores[slot], self.reasons[slot]
+        else:
+            scores, reasons = self.scores[:, slot], self.reasons[:, slot]
+        order = np.argsort(-scores, kind="stable")
+        results = []
+        for n in order:
+            if other.ids[n] in exclude:
+                continue
+            results.append([other.ids[n], round(float(scores[n]), 3), REASONS[reasons[n]]])
+            if k and len(results) == k:
+                break
+        return results
+
+    # --- persistence ---
+    def save(self, path):
+        """Write a full snapshot to `path` (atomically)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        shirts, pants = self.axes["shirts"], self.axes["pants"]
+        np.savez(
+            tmp_path,
+            shirt_ids=np.array(shirts.ids, dtype=str),
+            pant_ids=np.array(pants.ids, dtype=str),
+            shirt_lab=shirts.lab[:len(shirts)],
+            pant_lab=pants.lab[:len(pants)],
+            scores=self.scores,
+            reasons=self.reasons,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Snapshot at `path` plus any changes logged after it."""
+        try:
+            with np.load(path) as data:
+                matrix = cls(
+                    [str(i) for i in data["shirt_ids"]],
+                    [str(i) for i in data["pant_ids"]],
+                    data["shirt_lab"],
+                    data["pant_lab"],
+                    data["scores"],
+                    data["reasons"],
+                )
+        except FileNotFoundError:
+            matrix = cls()
+        try:
+            with open(path + ".log") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+        for line in lines:
+            try:
+                op = json.loads(line)
+            except ValueError:
+                continue  # torn final line from a crash mid-append
+            if op.get("op") == "add":
+                matrix.add(op["side"], op["id"], op["hex"])
+            elif op.get("op") == "remove":
+                matrix.remove(op["side"], op["id"])
+        matrix.pending = []
+        matrix.logged = len(lines)
+        return matrix
+
+    def persist(self, path, max_log_ops=None):
+        """Append pending changes to the log, or compact everything into a new snapshot.
+
+        Costs O(changes) except on compaction, which happens once per `max_log_ops` logged changes.
+        """
+        if not self.pending:
+            return
+        max_log_ops = max_log_ops or config.COMPAT_LOG_MAX_OPS
+        if self.logged + len(self.pending) > max_log_ops or not os.path.exists(path):
+            self.save(path)
+            try:
+                os.remove(path + ".log")
+            except FileNotFoundError:
+                pass
+            self.logged = 0
+        else:
+            with open(path + ".log", "a") as f:
+                f.write("".join(json.dumps(op) + "\n" for op in self.pending))
+            self.logged += len(self.pending)
+        self.pending = []
+
+
+# --- per-user store ---
+_matrices = OrderedDict()
+_locks = {}
+_store_lock = threading.Lock()
+
+
+def _path(username):
+    name = hashlib.sha256(username.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(config.CACHE_DIR, "compat", name + ".npz")
+
+
+def _user_lock(username):
+    with _store_lock:
+        return _locks.setdefault(username, threading.Lock())
+
+
+def _load(username):
+    """The user's matrix from memory, or from disk; keeps at most COMPAT_MAX_USERS in memory (LRU)."""
+    with _store_lock:
+        matrix = _matrices.get(username)
+        if matrix is not None:
+            _matrices.move_to_end(username)
+            return matrix
+    try:
+        matrix = CompatibilityMatrix.load(_path(username))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        matrix = CompatibilityMatrix()
+        # The files on disk are unreadable; replace them with a snapshot on the next change.
+        matrix.logged = config.COMPAT_LOG_MAX_OPS
+    with _store_lock:
+        _matrices[username] = matrix
+        while len(_matrices) > config.COMPAT_MAX_USERS:
+            # Evicted matrices have no pending changes: every update persists before returning.
+            _matrices.popitem(last=False)
+    return matrix
+
+
+def get_matrix(username, shirts, pants):
+    """The user's matrix, reconciled with the given Firestore maps and persisted if it changed."""
+    with _user_lock(username):
+        matrix = _load(username)
+        matrix.sync(shirts, pants)
+        matrix.persist(_path(username))
+        return matrix
+
+
+def record_added(username, items):
+    """Score newly saved `(firestore_map, item_id, hex)` items into the user's matrix."""
+    side_for_map = {v: k for k, v in FIRESTORE_MAPS.items()}
+    with _user_lock(username):
+        matrix = _load(username)
+        for firestore_map, item_id, hex_value in items:
+            matrix.add(side_for_map[firestore_map], item_id, hex_value)
+        matrix.persist(_path(username))
@@ -0,0 +1,101 @@
+"""Process-wide tunables, read once from the environment."""
+import os
+import tempfile
+
+
+def _env_int(name, default):
+    value = os.environ.get(name, "").strip()
+    return int(value) if value else default
+
+
+def _env_str(name, default):
+    return os.environ.get(name, "").strip() or default
+
+
+# --- Background removal (rembg / ONNX Runtime) ---
+REMBG_MODEL = _env_str("FASHN8_REMBG_MODEL", "u2net")
+# 0 lets ONNX Runtime pick; small values keep concurrent sessions from oversubscribing cores.
+ORT_INTRA_OP_THREADS = _env_int("FASHN8_ORT_INTRA_OP_THREADS", 0)
+ORT_INTER_OP_THREADS = _env_int("FASHN8_ORT_INTER_OP_THREADS", 0)
+
+# --- Pipeline cache (core/cache.py) ---
+CACHE_DIR = _env_str("FASHN8_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "fashn8"))
+CACHE_MEMORY_ITEMS = _env_int("FASHN8_CACHE_MEMORY_ITEMS", 256)
+CACHE_DISK_MB = _env_int("FASHN8_CACHE_DISK_MB", 512)
+
+# --- Dress++ bulk upload ---
+UPLOAD_WORKERS = _env_int("FASHN8_UPLOAD_WORKERS", 4)
+
+# --- Gradio caption clients (core/captioning.py) ---
+CAPTION_SPACE = _env_str("FASHN8_CAPTION_SPACE", "ovi054/image-to-prompt")
+CAPTION_POOL_SIZE = _env_int("FASHN8_CAPTION_POOL_SIZE", 4)
+CAPTION_TIMEOUT_S = _env_int("FASHN8_CAPTION_TIMEOUT_S", 60)
+
+# --- Upload normalization (core/preprocess.py) ---
+# Long side used for Clarifai detection and rembg matting.
+WORK_MAX_SIDE = _env_int("FASHN8_WORK_MAX_SIDE", 1024)
+# Long side kept for the crops that get captioned and stored.
+CROP_MAX_SIDE = _env_int("FASHN8_CROP_MAX_SIDE", 2048)
+PAYLOAD_FORMAT = _env_str("FASHN8_PAYLOAD_FORMAT", "JPEG").upper()
+PAYLOAD_QUALITY = _env_int("FASHN8_PAYLOAD_QUALITY", 90)
+
+# --- Wardrobe image storage (core/media.py) ---
+MASTER_MAX_SIDE = _env_int("FASHN8_MASTER_MAX_SIDE", 1600)
+MASTER_QUALITY = _env_int("FASHN8_MASTER_QUALITY", 85)
+THUMB_MAX_SIDE = _env_int("FASHN8_THUMB_MAX_SIDE", 320)
+THUMB_QUALITY = _env_int("FASHN8_THUMB_QUALITY", 75)
+
+# --- Duplicate detection (core/phash.py) ---
+# Max Hamming distance between 64-bit dHashes to treat two crops as the same garment.
+DUPLICATE_MAX_DISTANCE = _env_int("FASHN8_DUPLICATE_MAX_DISTANCE", 8)
+# The dHash ignores color, so a shape match also needs stored hexes within this CIEDE2000 distance.
+DUPLICATE_MAX_DELTA_E = _env_int("FASHN8_DUPLICATE_MAX_DELTA_E", 10)
+
+# --- Outfit matching (core/harmony.py) ---
+# Candidates per item sent to the LLM; the rest of the wardrobe never leaves the server.
+MATCH_SHORTLIST_K = _env_int("FASHN8_MATCH_SHORTLIST_K", 8)
+# Browser-side Gemini timeout before falling back to the local ranking.
+MATCH_LLM_TIMEOUT_MS = _env_int("FASHN8_MATCH_LLM_TIMEOUT_MS", 6000)
+# After the local fallback ranking was used, wait this long before asking the LLM again for that item.
+MATCH_LOCAL_RETRY_S = _env_int("FASHN8_MATCH_LOCAL_RETRY_S", 300)
+
+# --- Compatibility matrix store (core/compat.py) ---
+# Users whose matrices stay in memory per process (least recently used are dropped).
+COMPAT_MAX_USERS = _env_int("FASHN8_COMPAT_MAX_USERS", 64)
+# Logged adds/removes before the matrix is rewritten as a full snapshot.
+COMPAT_LOG_MAX_OPS = _env_int("FASHN8_COMPAT_LOG_MAX_OPS", 256)
+
+# --- Snap Shop wardrobe similarity (core/descriptors.py, core/colorindex.py) ---
+SIMILAR_TOP_K = _env_int("FASHN8_SIMILAR_TOP_K", 4)
+# CIEDE2000 distance beyond which a wardrobe item no longer counts as the same color.
+SIMILAR_MAX_DELTA_E = _env_int("FASHN8_SIMILAR_MAX_DELTA_E", 20)
+# Lowest descriptor cosine similarity, in percent, shown as a visual match (core/descriptors.py).
+SIMILAR_MIN_SIMILARITY = _env_int("FASHN8_SIMILAR_MIN_SIMILARITY", 50)
+# (user, collection) descriptor indexes kept mapped per process (least recently used are dropped).
+SIMILAR_MAX_INDEXES = _env_int("FASHN8_SIMILAR_MAX_INDEXES", 128)
+
+# --- Today's Drip wardrobe browser ---
+# Items sent to the carousel per page; the browser only builds cards near the focused one.
+WARDROBE_PAGE_SIZE = _env_int("FASHN8_WARDROBE_PAGE_SIZE", 48)
+# Cards kept in the DOM on each side of the focused card.
+CAROUSEL_WINDOW = _env_int("FASHN8_CAROUSEL_WINDOW", 3)
+
+# --- Virtual try-on jobs (core/tryon.py) ---
+TRYON_SPACE = _env_str("FASHN8_TRYON_SPACE", "fashn-ai/fashn-vton-1.5")
+# Try-ons running against the Space at once per server process; the rest wait in line.
+TRYON_MAX_JOBS = _env_int("FASHN8_TRYON_MAX_JOBS", 2)
+TRYON_TIMEOUT_S = _env_int("FASHN8_TRYON_TIMEOUT_S", 300)
+# Finished jobs (and their output images) kept in memory per process.
+TRYON_JOB_HISTORY = _env_int("FASHN8_TRYON_JOB_HISTORY", 200)
+# Output images cached by input hashes; kept apart from the pipeline cache so they don't evict it.
+TRYON_CACHE_MEMORY_ITEMS = _env_int("FASHN8_TRYON_CACHE_MEMORY_ITEMS", 32)
+TRYON_CACHE_DISK_MB = _env_int("FASHN8_TRYON_CACHE_DISK_MB", 256)
+# Person photos are downscaled to this long side (the model works well below it) and
+# uploaded to the Space once; the remote copy is reused for this long.
+TRYON_PERSON_MAX_SIDE = _env_int("FASHN8_TRYON_PERSON_MAX_SIDE", 1024)
+TRYON_PERSON_QUALITY = _env_int("FASHN8_TRYON_PERSON_QUALITY", 92)
+TRYON_UPLOAD_TTL_S = _env_int("FASHN8_TRYON_UPLOAD_TTL_S", 1800)
+
+# --- Scratch files (core/scratch.py) ---
+SCRATCH_DIR = _env_str("FASHN8_SCRATCH_DIR", os.path.join(tempfile.gettempdir(), "fashn8-scratch"))
+SCRATCH_MB = _env_int("FASHN8_SCRATCH_MB", 256)
@@ -0,0 +1,278 @@
+"""Compact visual descriptors and a per-user cosine-similarity index.
+
+One dominant hex cannot tell a striped navy shirt from a plain one. Dress++
+computes a descriptor for each background-removed crop when it is uploaded.
+The descriptor has two parts:
+
+- color: a quantized HSV histogram of the visible pixels (8 hue x 3
+  saturation x 3 value bins, square-rooted so cosine behaves like the
+  Bhattacharyya coefficient);
+- texture: a magnitude-weighted gradient-orientation histogram, a
+  rotation-invariant uniform LBP histogram, edge density and mean gradient
+  strength, computed with OpenCV on the grey crop.
+
+Each block is L2-normalized and scaled by the square root of its weight.
+The cosine of two descriptors is therefore the weighted sum of the
+per-block cosines. The vector is stored on the item as base64 float16
+(`vis`), so any server process can rebuild the index without re-downloading
+images.
+
+Per user and collection, the descriptors live in one contiguous float32
+`.npy` under FASHN8_CACHE_DIR, opened with `mmap_mode="r"`. All sessions in
+a process share one mapping, and other processes map the same pages. A
+change writes a new, uniquely named matrix file and then atomically swaps
+the id list that points at it. Readers never see a half-written matrix,
+and a file that is already mapped is never rewritten. Superseded matrices
+are only deleted once they are STALE_MATRIX_S older than the one the id list
+points at. Another process that is between writing its matrix and swapping
+the id list therefore never loses its file.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+HSV_BINS = (8, 3, 3)
+ORIENTATION_BINS = 8
+LBP_BINS = 10
+COLOR_WEIGHT = 0.6
+DIM = int(np.prod(HSV_BINS)) + ORIENTATION_BINS + LBP_BINS + 2
+
+# Pixels with alpha at or below this are background (same threshold as core.colors).
+ALPHA_THRESHOLD = 30
+WORK_SIDE = 128
+# Grace period before a superseded matrix file may be deleted.
+STALE_MATRIX_S = 60
+
+
+def _block(values, weight):
+    norm = np.linalg.norm(values)
+    return values / norm * np.sqrt(weight) if norm else values
+
+
+def _lbp_histogram(grey, mask):
+    """Rotation-invariant uniform LBP (8 neighbours, radius 1): 9 uniform codes plus one 'other' bin."""
+    center = grey[1:-1, 1:-1].astype(np.int16)
+    h, w = grey.shape
+    bits = np.zeros(center.shape + (8,), dtype=bool)
+    for n, (dy, dx) in enumerate(((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))):
+        bits[..., n] = grey[1 + dy:h - 1 + dy, 1 + dx:w - 1 + dx] >= center
+    transitions = (bits != np.roll(bits, 1, axis=2)).sum(axis=2)
+    codes = np.where(transitions <= 2, bits.sum(axis=2), 9)
+    return np.bincount(codes[mask[1:-1, 1:-1]], minlength=LBP_BINS).astype(np.float32)
+
+
+def describe(crop):
+    """float32 descriptor (DIM,) for a PIL crop; transparent pixels are ignored."""
+    image = crop.convert("RGBA")
+    if max(image.size) > WORK_SIDE:
+        image = image.copy()
+        image.thumbnail((WORK_SIDE, WORK_SIDE), Image.BILINEAR)
+    rgba = np.asarray(image)
+    mask = rgba[..., 3] > ALPHA_THRESHOLD
+    if not mask.any():
+        mask[:] = True
+    rgb = np.ascontiguousarray(rgba[..., :3])
+    mask_u8 = mask.astype(np.uint8) * 255
+
+    hsv = cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)
+    color = cv2.calcHist([hsv], [0, 1, 2], mask_u8, list(HSV_BINS), [0, 180, 0, 256, 0, 256]).ravel()
+    color = np.sqrt(color / max(color.sum(), 1))
+
+    grey = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    gx = cv2.Sobel(grey, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(grey, cv2.CV_32F, 0, 1, ksize=3)
+    magnitude, angle = cv2.cartToPolar(gx, gy, angleInDegrees=True)
+    # Orientation modulo 180 degrees: a stripe's two edges point the same way.
+    bins = ((angle[mask] % 180) / (180 / ORIENTATION_BINS)).astype(int) % ORIENTATION_BINS
+    orientation = np.bincount(bins, weights=magnitude[mask], minlength=ORIENTATION_BINS)
+    orientation = orientation / max(orientation.sum(), 1e-6)
+    lbp = _lbp_histogram(grey, mask)
+    lbp = lbp / max(lbp.sum(), 1)
+    edges = cv2.Canny(grey, 60, 160)
+    strength = [(edges[mask] > 0).mean(), min(float(magnitude[mask].mean()) / 255, 1.0)]
+    texture = np.concatenate([orientation, lbp, strength])
+
+    return np.concatenate([_block(color, COLOR_WEIGHT), _block(texture, 1 - COLOR_WEIGHT)]).astype(np.float32)
+
+
+def to_field(vector):
+    """Compact base64 float16 form stored on the Firestore item."""
+    return base64.b64encode(np.asarray(vector, dtype="<f2").tobytes()).decode("ascii")
+
+
+def from_field(text):
+    vector = np.frombuffer(base64.b64decode(text), dtype="<f2").astype(np.float32)
+    return vector if vector.shape == (DIM,) else None
+
+
+class DescriptorIndex:
+    """Item ids and a read-only (possibly memory-mapped) (N, DIM) float32 matrix of unit vectors.
+
+    Both are published together as one tuple, so a search running while another
+    session syncs sees either the old pair or the new one, never a mix.
+    """
+
+    def __init__(self, ids=(), vectors=None):
+        vectors = vectors if vectors is not None else np.zeros((0, DIM), dtype=np.float32)
+        self._data = (tuple(ids), vectors)
+
+    @property
+    def ids(self):
+        return self._data[0]
+
+    @property
+    def vectors(self):
+        return self._data[1]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, item_id):
+        return item_id in self.ids
+
+    def snapshot(self):
+        """A copy sharing the current ids and matrix; later syncs of this index don't change it."""
+        return DescriptorIndex(*self._data)
+
+    def sync(self, mapping):
+        """Match the Firestore wardrobe map: drop deleted items, add new ones carrying `vis`.
+
+        Returns True if the matrix changed; the new matrix is then held in memory until saved.
+        """
+        ids, vectors = self._data
+        current = set(mapping)
+        keep = [n for n, item_id in enumerate(ids) if item_id in current]
+        known = set(ids)
+        added_ids, added = [], []
+        for item_id, entry in mapping.items():
+            if item_id in known or not (entry or {}).get("vis"):
+                continue
+            vector = from_field(entry["vis"])
+            if vector is not None:
+                added_ids.append(item_id)
+                added.append(vector / (np.linalg.norm(vector) or 1))
+        if len(keep) == len(ids) and not added:
+            return False
+        self._data = (
+            tuple(ids[n] for n in keep) + tuple(added_ids),
+            np.concatenate([vectors[keep], np.array(added, dtype=np.float32).reshape(-1, DIM)]),
+        )
+        return True
+
+    def nearest(self, vector, k=4):
+        """Up to `k` `(item id, cosine similarity)` pairs, most similar first."""
+        ids, vectors = self._data
+        if not ids:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        similarity = vectors @ (query / (np.linalg.norm(query) or 1))
+        k = min(k, len(similarity))
+        best = np.argpartition(-similarity, k - 1)[:k]
+        best = best[np.argsort(-similarity[best], kind="stable")]
+        return [(ids[n], round(float(similarity[n]), 3)) for n in best]
+
+    # --- persistence ---
+    def save(self, stem):
+        """Write a fresh `<stem>.<token>.npy`, then atomically point `<stem>.json` at it."""
+        directory = os.path.dirname(stem)
+        os.makedirs(directory, exist_ok=True)
+        ids, vectors = self._data
+        token = uuid.uuid4().hex[:12]
+        matrix_path = f"{stem}.{token}.npy"
+        np.save(matrix_path, np.ascontiguousarray(vectors, dtype=np.float32))
+        tmp_path = f"{stem}.{token}.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"matrix": token, "ids": list(ids)}, f)
+        os.replace(tmp_path, stem + ".json")
+        self._data = (ids, np.load(matrix_path, mmap_mode="r"))
+        _remove_stale(stem)
+
+    @classmethod
+    def load(cls, stem):
+        with open(stem + ".json") as f:
+            meta = json.load(f)
+        vectors = np.load(f"{stem}.{meta['matrix']}.npy", mmap_mode="r")
+        if vectors.shape != (len(meta["ids"]), DIM):
+            raise ValueError("descriptor matrix does not match its id list")
+        return cls(meta["ids"], vectors)
+
+
+def _remove_stale(stem):
+    """Delete matrices well older than the one `<stem>.json` now points at (possibly another process's)."""
+    try:
+        with open(stem + ".json") as f:
+            current = f"{os.path.basename(stem)}.{json.load(f)['matrix']}.npy"
+        directory = os.path.dirname(stem)
+        cutoff = os.path.getmtime(os.path.join(directory, current)) - STALE_MATRIX_S
+    except (OSError, KeyError, ValueError):
+        return
+    prefix = os.path.basename(stem) + "."
+    for name in os.listdir(directory):
+        if not (name.startswith(prefix) and name.endswith(".npy")) or name == current:
+            continue
+        path = os.path.join(directory, name)
+        try:
+            # Open mappings keep their file alive after unlinking; only new readers see the new matrix.
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+# --- per-user store ---
+_indexes = OrderedDict()
+_locks = {}
+_store_lock = threading.Lock()
+
+
+def _stem(username, collection):
+    name = hashlib.sha256(username.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(config.CACHE_DIR, "descriptors", f"{name}_{collection}")
+
+
+def _lock(key):
+    with _store_lock:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def get_descriptor_index(username, collection, items):
+    """The user's index for one collection, reconciled with the Firestore map and saved if it changed.
+
+    Returns a snapshot, so `nearest` and `ids` agree even while another session syncs.
+    At most SIMILAR_MAX_INDEXES indexes stay in memory (LRU); an evicted one is reloaded from disk.
+    """
+    key = (username, collection)
+    with _lock(key):
+        with _store_lock:
+            index = _indexes.get(key)
+            if index is not None:
+                _indexes.move_to_end(key)
+        if index is None:
+            try:
+                index = DescriptorIndex.load(_stem(username, collection))
+            except (OSError, KeyError, ValueError):
+                index = DescriptorIndex()
+            with _store_lock:
+                _indexes[key] = index
+                while len(_indexes) > config.SIMILAR_MAX_INDEXES:
+                    _indexes.popitem(last=False)
+        if index.sync(items):
+            try:
+                index.save(_stem(username, collection))
+            except (OSError, ValueError):
+                # The in-memory matrix is still correct; the next change tries to persist again.
+                logger.warning("Could not persist descriptors for %s/%s", username, collection, exc_info=True)
+        return index.snapshot()
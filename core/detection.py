@@ -0,0 +1,102 @@
+"""Process-wide Clarifai apparel detector with batched prediction.
+
+Building a `clarifai.client.model.Model` resolves the model and opens a gRPC
+channel, so it is done once per (model URL, PAT) and reused by every page and
+session. `detect_many` sends many images in a single `predict` call. The
+network backend can be swapped for `LocalBackend` to benchmark the stage
+offline.
+"""
+import threading
+import time
+
+APPAREL_MODEL_URL = "https://clarifai.com/clarifai/main/models/apparel-detection"
+# Clarifai rejects predict calls with more inputs than this.
+MAX_BATCH_SIZE = 128
+
+
+def regions_from_output(output):
+    """Flatten one Clarifai output into picklable region dicts."""
+    regions = []
+    for region in output.data.regions:
+        concept = region.data.concepts[0]
+        box = region.region_info.bounding_box
+        regions.append({
+            "label": concept.name,
+            "confidence": float(concept.value),
+            "box": (box.left_col, box.top_row, box.right_col, box.bottom_row),
+        })
+    return regions
+
+
+class ClarifaiBackend:
+    """Clarifai apparel-detection model over one long-lived gRPC channel."""
+
+    def __init__(self, pat, url=APPAREL_MODEL_URL):
+        from clarifai.client.input import Inputs
+        from clarifai.client.model import Model
+
+        self._inputs = Inputs
+        self.model = Model(url=url, pat=pat)
+
+    def predict(self, images):
+        inputs = [
+            self._inputs.get_input_from_bytes(input_id=str(n), image_bytes=image_bytes)
+            for n, image_bytes in enumerate(images)
+        ]
+        response = self.model.predict(inputs=inputs)
+        return [regions_from_output(output) for output in response.outputs]
+
+
+class LocalBackend:
+    """Offline stand-in that returns fixed regions after a simulated round trip.
+
+    `call_latency` is paid once per predict call and `image_latency` once per
+    image, which is roughly how a remote batch endpoint behaves.
+    """
+
+    def __init__(self, regions=None, call_latency=0.0, image_latency=0.0):
+        self.regions = regions if regions is not None else [
+            {"label": "top", "confidence": 0.95, "box": (0.2, 0.1, 0.8, 0.55)},
+            {"label": "pants", "confidence": 0.9, "box": (0.25, 0.5, 0.75, 0.95)},
+        ]
+        self.call_latency = call_latency
+        self.image_latency = image_latency
+        self.calls = 0
+
+    def predict(self, images):
+        self.calls += 1
+        time.sleep(self.call_latency + self.image_latency * len(images))
+        return [[dict(region) for region in self.regions] for _ in images]
+
+
+class ApparelDetector:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def detect(self, image_bytes):
+        """Regions for one encoded image."""
+        return self.detect_many([image_bytes])[0]
+
+    def detect_many(self, images):
+        """Regions for each encoded image, using as few predict calls as possible."""
+        results = []
+        for start in range(0, len(images), MAX_BATCH_SIZE):
+            results.extend(self.backend.predict(images[start:start + MAX_BATCH_SIZE]))
+        return results
+
+
+_detectors = {}
+_lock = threading.Lock()
+
+
+def get_detector(pat, url=APPAREL_MODEL_URL):
+    """Return the shared Clarifai-backed detector for this PAT and model URL."""
+    key = (url, pat)
+    detector = _detectors.get(key)
+    if detector is None:
+        with _lock:
+            detector = _detectors.get(key)
+            if detector is None:
+                detector = ApparelDetector(ClarifaiBackend(pat, url))
+                _detectors[key] = detector
+    return detector
@@ -0,0 +1,50 @@
+"""Hand images to Gradio Spaces without a temp-file round trip."""
+import io
+
+import httpx
+from gradio_client import handle_file
+
+from core.scratch import get_scratch
+
+
+def encode_image(image, fmt="PNG", **save_kwargs):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **save_kwargs)
+    return buffer.getvalue()
+
+
+def upload_bytes(client, data, filename):
+    """Upload raw bytes to the Space's file store and return a `handle_file` reference.
+
+    This is the same request `gradio_client` makes for local paths, but fed from
+    memory. The returned reference is a URL, so the client won't re-upload it.
+    """
+    response = httpx.post(
+        client.upload_url,
+        headers=client.headers,
+        cookies=getattr(client, "cookies", None),
+        verify=getattr(client, "ssl_verify", True),
+        files=[("files", (filename, data))],
+        **getattr(client, "httpx_kwargs", {}),
+    )
+    response.raise_for_status()
+    server_path = response.json()[0]
+    return handle_file(f"{client.src_prefixed}file={server_path}")
+
+
+class TempFileHandle:
+    """Fallback hand-off through a scratch file that is removed on exit."""
+
+    def __init__(self, data, suffix, space=None):
+        self.data = data
+        self.suffix = suffix
+        self.space = space
+        self._file = None
+
+    def __enter__(self):
+        space = self.space or get_scratch().shared
+        self._file = space.file(self.data, self.suffix)
+        return handle_file(self._file.__enter__())
+
+    def __exit__(self, *exc):
+        return self._file.__exit__(*exc)
@@ -0,0 +1,103 @@
+"""Vectorized color-harmony scoring of shirt x pant pairs in CIELAB.
+
+Every stored `hex` is converted to CIELAB once (memoized per hex), then all
+pairs are scored in one NumPy pass with simple styling rules:
+
+- neutral anchoring: a low-chroma piece (black, white, grey, beige, navy-ish)
+  goes with almost anything;
+- complementary / analogous / triadic hue relationships between chromatic pieces;
+- lightness contrast between top and bottom;
+- a penalty when both pieces are loud (high chroma), and a smaller one for
+  a single very saturated piece.
+
+Scores are in [0, 1]. Each pair also carries the rule that contributed most,
+which doubles as a human-readable reason when no LLM is available.
+"""
+import numpy as np
+
+NEUTRAL_CHROMA = 14.0
+LOUD_CHROMA = 45.0
+
+REASONS = (
+    "A neutral piece anchors the outfit and lets the other color lead.",
+    "Complementary hues balance each other for a confident contrast.",
+    "Analogous hues give a cohesive, tonal look.",
+    "A triadic pairing adds playful but balanced color.",
+    "Clear light-dark contrast keeps the outfit crisp.",
+)
+NEUTRAL, COMPLEMENTARY, ANALOGOUS, TRIADIC, CONTRAST = range(len(REASONS))
+
+_lab_cache = {}
+
+
+def hex_to_rgb(hex_values):
+    """(N, 3) float array in [0, 1] from '#rrggbb' strings; bad values become mid grey."""
+    rgb = np.full((len(hex_values), 3), 0.5)
+    for n, value in enumerate(hex_values):
+        value = (value or "").lstrip("#")
+        if len(value) == 6:
+            try:
+                rgb[n] = [int(value[i:i + 2], 16) / 255.0 for i in (0, 2, 4)]
+            except ValueError:
+                pass
+    return rgb
+
+
+def rgb_to_lab(rgb):
+    """sRGB in [0, 1] (N, 3) -> CIELAB (D65) (N, 3)."""
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    matrix = np.array([
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ])
+    xyz = linear @ matrix.T / np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def hex_to_lab(hex_values):
+    """CIELAB for each hex, converting only values not seen before in this process."""
+    missing = [h for h in dict.fromkeys(hex_values) if h not in _lab_cache]
+    if missing:
+        for h, lab in zip(missing, rgb_to_lab(hex_to_rgb(missing))):
+            _lab_cache[h] = lab
+    if not hex_values:
+        return np.zeros((0, 3))
+    return np.array([_lab_cache[h] for h in hex_values])
+
+
+def _bump(x, center, width):
+    return np.exp(-0.5 * ((x - center) / width) ** 2)
+
+
+def score_pairs(lab_a, lab_b):
+    """Score every pair of rows in `lab_a` (A, 3) and `lab_b` (B, 3).
+
+    Returns (scores, reasons): float32 (A, B) in [0, 1] and int8 (A, B) indexes into REASONS.
+    """
+    L1, a1, b1 = (lab_a[:, i][:, None] for i in range(3))
+    L2, a2, b2 = (lab_b[:, i][None, :] for i in range(3))
+    c1, c2 = np.hypot(a1, b1), np.hypot(a2, b2)
+    h1, h2 = np.degrees(np.arctan2(b1, a1)), np.degrees(np.arctan2(b2, a2))
+    dh = np.abs(h1 - h2) % 360
+    dh = np.minimum(dh, 360 - dh)
+
+    neutral = np.maximum(_bump(c1, 0, NEUTRAL_CHROMA), _bump(c2, 0, NEUTRAL_CHROMA))
+    rules = np.stack(np.broadcast_arrays(
+        neutral,
+        _bump(dh, 180, 30),
+        _bump(dh, 0, 25),
+        0.75 * _bump(dh, 120, 18),
+    ))
+    hue_score = rules.max(axis=0)
+
+    d_lightness = np.abs(L1 - L2)
+    contrast = _bump(d_lightness, 40, 22)
+    both_loud = np.clip((np.minimum(c1, c2) - LOUD_CHROMA) / 40, 0, 1)
+    one_loud = np.clip((np.maximum(c1, c2) - 2 * LOUD_CHROMA) / 40, 0, 1)
+
+    scores = 0.55 * hue_score + 0.35 * contrast + 0.10 - 0.25 * both_loud - 0.15 * one_loud
+    reasons = rules.argmax(axis=0).astype(np.int8)
+    reasons[(contrast > hue_score) & (d_lightness > 25)] = CONTRAST
+    return np.clip(scores, 0, 1).astype(np.float32), reasons
@@ -0,0 +1,48 @@
+"""WebP master + thumbnail encoding and Cloudinary upload for wardrobe crops.
+
+Each garment is stored twice: a compressed WebP master (alpha preserved) in
+`img` and a small WebP thumbnail in `thumb`. Carousels and grids load the
+thumbnail; the master is only used where the garment is shown large.
+"""
+import io
+
+import cloudinary.uploader
+from PIL import Image
+
+from core import config
+
+FOLDER = "fashion8"
+
+
+def encode_webp(image, max_side, quality):
+    """Encode `image` as WebP with its long side capped at `max_side`."""
+    if max(image.size) > max_side:
+        image = image.copy()
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def encode_master(image):
+    return encode_webp(image, config.MASTER_MAX_SIDE, config.MASTER_QUALITY)
+
+
+def encode_thumb(image):
+    return encode_webp(image, config.THUMB_MAX_SIDE, config.THUMB_QUALITY)
+
+
+def upload_webp(data, public_id, folder=FOLDER):
+    """Upload WebP bytes to Cloudinary and return the secure URL."""
+    result = cloudinary.uploader.upload(io.BytesIO(data), folder=folder, public_id=public_id)
+    return result['secure_url']
+
+
+def upload_garment(image, public_id, folder=FOLDER):
+    """Upload the master and thumbnail for a crop; returns {"img": url, "thumb": url}."""
+    return {
+        "img": upload_webp(encode_master(image), public_id, folder),
+        "thumb": upload_webp(encode_thumb(image), f"{public_id}_thumb", folder),
+    }
@@ -0,0 +1,77 @@
+"""Perceptual hashing and a Hamming-distance index for duplicate garments.
+
+A 64-bit dHash of the background-removed crop changes little between two
+photos of the same shirt, so re-uploads can be caught before any caption,
+Cloudinary or Firestore work is done. The per-user index keeps all hashes in
+one uint64 array and answers lookups with a single XOR + popcount pass.
+The hash is computed on grey levels, so it only compares shape: callers
+must also compare the stored colors before calling two crops the same.
+"""
+import numpy as np
+from PIL import Image
+
+from core import config
+
+
+def dhash(image, hash_size=8):
+    """64-bit difference hash of a crop; transparent pixels are treated as white."""
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image)
+    small = np.asarray(
+        image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS), dtype=np.int16
+    )
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def to_hex(value):
+    return "%016x" % value
+
+
+def from_hex(text):
+    return int(text, 16)
+
+
+def _popcount(values):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class HashIndex:
+    """Hashes for one user's wardrobe, keyed by (collection, item id)."""
+
+    def __init__(self, entries=()):
+        self.keys = []
+        hashes = []
+        for key, value in entries:
+            self.keys.append(key)
+            hashes.append(value)
+        self.hashes = np.array(hashes, dtype=np.uint64)
+
+    @classmethod
+    def from_field(cls, hashes_field):
+        """Build from the Firestore `hashes` map (`"<collection>_<id>" -> hex`)."""
+        entries = []
+        for name, value in (hashes_field or {}).items():
+            collection, _, item_id = name.rpartition("_")
+            entries.append(((collection, item_id), from_hex(value)))
+        return cls(entries)
+
+    def nearest(self, value, collection=None, max_distance=None):
+        """(key, distance) pairs within `max_distance`, closest first."""
+        if max_distance is None:
+            max_distance = config.DUPLICATE_MAX_DISTANCE
+        if not self.keys:
+            return []
+        distances = _popcount(np.bitwise_xor(self.hashes, np.uint64(value)))
+        order = np.argsort(distances, kind="stable")
+        matches = []
+        for n in order:
+            if distances[n] > max_distance:
+                break
+            if collection is None or self.keys[n][0] == collection:
+                matches.append((self.keys[n], int(distances[n])))
+        return matches
@@ -0,0 +1,42 @@
+"""Cached garment-extraction pipeline shared by Dress++ and Snap Shop.
+
+Every stage is keyed by the SHA-256 of its input bytes, so a Streamlit rerun
+(e.g. clicking an "Upload" button) or a second user submitting the same photo
+reuses the background removal, detection, color and caption results.
+"""
+import io
+
+from PIL import Image
+
+from core.background import remove_background
+from core.cache import content_key, get_cache
+from core.colors import get_dominant_color
+
+
+def image_key(image):
+    """Content key for a decoded PIL image (mode, size and raw pixels)."""
+    return content_key(image.mode, "%dx%d" % image.size, image.tobytes())
+
+
+def cached_remove_background(image_bytes):
+    def compute():
+        buffer = io.BytesIO()
+        remove_background(image_bytes).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    png = get_cache().get_or_compute("bg", content_key(image_bytes), compute)
+    return Image.open(io.BytesIO(png)).convert("RGBA")
+
+
+def cached_detect_regions(image_bytes, detect):
+    """`detect(image_bytes)` must return a list of region dicts (see core.detection)."""
+    return get_cache().get_or_compute("regions", content_key(image_bytes), lambda: detect(image_bytes))
+
+
+def cached_dominant_color(crop):
+    return get_cache().get_or_compute("color", image_key(crop), lambda: get_dominant_color(crop)[0])
+
+
+def cached_caption(crop, caption_fn):
+    """`caption_fn(crop)` returns the raw caption text for a PIL crop."""
+    return get_cache().get_or_compute("caption", image_key(crop), lambda: caption_fn(crop))
@@ -0,0 +1,124 @@
+"""Fill the weekly planner in one solve over the compatibility matrix.
+
+Choosing one shirt/pant pair per free day, with no item worn twice, is a
+maximum-weight bipartite matching with exactly `days` edges. It is solved
+exactly with successive shortest augmenting paths. Each round adds one pair
+and keeps the matching optimal for its size, so a week costs seven dense
+Dijkstra passes over the scores that core.compat already keeps, with no LLM
+calls.
+"""
+import numpy as np
+
+from core.harmony import REASONS
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def max_weight_matching(scores, size):
+    """`(row, col)` pairs of a maximum-total-score matching with `min(size, rows, cols)` edges."""
+    rows, cols = scores.shape
+    size = min(size, rows, cols)
+    if size == 0:
+        return []
+    # Non-negative costs; every augmentation adds exactly one matched edge, so the shift is constant.
+    cost = scores.max() - scores.astype(np.float64)
+    match_row = np.full(rows, -1)
+    match_col = np.full(cols, -1)
+    pot_row, pot_col, pot_sink = np.zeros(rows), np.zeros(cols), 0.0
+    inf = np.inf
+
+    for _ in range(size):
+        # Dijkstra from a virtual source (linked to free rows) to a virtual sink (linked to free cols).
+        # Free rows can only be reached from the source, so they are settled and relaxed in one step.
+        free_rows = np.flatnonzero(match_row < 0)
+        dist_row = np.where(match_row < 0, -pot_row, inf)
+        reduced = cost[free_rows] - pot_col
+        best = np.argmin(reduced, axis=0)
+        dist_col = reduced[best, np.arange(cols)]
+        dist_sink = inf
+        prev_row = np.full(rows, -1)   # pant we reached this shirt from, -1 = source
+        prev_col = free_rows[best]     # shirt we reached this pant from
+        prev_sink = -1
+        open_row = match_row >= 0
+        open_col = np.ones(cols, dtype=bool)
+
+        while True:
+            r = np.argmin(np.where(open_row, dist_row, inf))
+            c = np.argmin(np.where(open_col, dist_col, inf))
+            best_row = dist_row[r] if open_row[r] else inf
+            best_col = dist_col[c] if open_col[c] else inf
+            if dist_sink <= min(best_row, best_col):
+                break
+            if best_row <= best_col:
+                open_row[r] = False
+                reduced = best_row + cost[r] + pot_row[r] - pot_col
+                reduced[~open_col] = inf
+                if match_row[r] >= 0:
+                    reduced[match_row[r]] = inf
+                better = reduced < dist_col
+                dist_col[better] = reduced[better]
+                prev_col[better] = r
+            else:
+                open_col[c] = False
+                partner = match_col[c]
+                if partner >= 0:
+                    candidate = best_col - cost[partner, c] + pot_col[c] - pot_row[partner]
+                    if open_row[partner] and candidate < dist_row[partner]:
+                        dist_row[partner] = candidate
+                        prev_row[partner] = c
+                else:
+                    candidate = best_col + pot_col[c] - pot_sink
+                    if candidate < dist_sink:
+                        dist_sink = candidate
+                        prev_sink = c
+
+        # Keep reduced costs non-negative for the next round
+        pot_row += np.minimum(dist_row, dist_sink)
+        pot_col += np.minimum(dist_col, dist_sink)
+        pot_sink += dist_sink
+
+        c = prev_sink
+        while True:
+            r = prev_col[c]
+            next_c = prev_row[r]
+            match_row[r], match_col[c] = c, r
+            if next_c < 0:
+                break
+            c = next_c
+
+    return [(r, int(match_row[r])) for r in np.flatnonzero(match_row >= 0)]
+
+
+def plan_week(matrix, locked=None, days=DAYS):
+    """Give every unlocked day a distinct shirt/pant pair, maximizing total compatibility.
+
+    `locked` maps day -> {"shirt": id, "pant": id}; those outfits are kept and
+    their items aren't reused. Returns {day: {"shirt", "pant", "score", "reason"}}
+    for the unlocked days, best pair first. Days the wardrobe can't cover get empty ids.
+    """
+    locked = locked or {}
+    free_days = [day for day in days if day not in locked]
+    taken = {side: {outfit.get(key) for outfit in locked.values()} for side, key in (("shirts", "shirt"), ("pants", "pant"))}
+    shirt_ids, pant_ids = matrix.axes["shirts"].ids, matrix.axes["pants"].ids
+    rows = np.array([n for n, item_id in enumerate(shirt_ids) if item_id not in taken["shirts"]], dtype=int)
+    cols = np.array([n for n, item_id in enumerate(pant_ids) if item_id not in taken["pants"]], dtype=int)
+
+    pairs = []
+    if len(rows) and len(cols):
+        scores = matrix.scores[np.ix_(rows, cols)]
+        pairs = [(rows[r], cols[c]) for r, c in max_weight_matching(scores, len(free_days))]
+        pairs.sort(key=lambda rc: -matrix.scores[rc])
+
+    plan = {}
+    for n, day in enumerate(free_days):
+        if n < len(pairs):
+            r, c = pairs[n]
+            plan[day] = {
+                "shirt": shirt_ids[r],
+                "pant": pant_ids[c],
+                "score": round(float(matrix.scores[r, c]), 3),
+                "reason": REASONS[matrix.reasons[r, c]],
+            }
+        else:
+            plan[day] = {"shirt": "", "pant": "", "score": None, "reason": None}
+    return plan
@@ -0,0 +1,74 @@
+"""Upload normalization before detection and matting.
+
+Phone photos are decoded with JPEG draft mode (DCT-domain downscaling), capped
+at CROP_MAX_SIDE for the crops we keep, and downscaled again to WORK_MAX_SIDE
+for Clarifai and rembg. That smaller image is sent as a compact JPEG/WebP
+instead of a full-size PNG. Detection boxes are normalized, so they map straight
+back onto the larger image, and the matte is upscaled to cut the crops there.
+"""
+import io
+from collections import namedtuple
+
+from PIL import Image, ImageOps
+
+from core import config
+
+PreparedImage = namedtuple("PreparedImage", ["original", "work", "payload"])
+
+
+def _open(source):
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return Image.open(source)
+
+
+def _bounded(image, max_side):
+    if max(image.size) > max_side:
+        image = image.copy()
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    return image
+
+
+def prepare_image(source, work_max_side=None, crop_max_side=None, fmt=None, quality=None):
+    """Decode an upload (file-like, path or bytes) into a PreparedImage.
+
+    - `original`: RGB image, long side <= crop_max_side, used for crops.
+    - `work`: RGB image, long side <= work_max_side, used for detection/matting.
+    - `payload`: `work` encoded as JPEG/WebP; also the content-cache key input.
+    """
+    work_max_side = work_max_side or config.WORK_MAX_SIDE
+    crop_max_side = crop_max_side or config.CROP_MAX_SIDE
+    fmt = (fmt or config.PAYLOAD_FORMAT).upper()
+    quality = quality or config.PAYLOAD_QUALITY
+
+    image = _open(source)
+    if image.format == "JPEG":
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale while staying >= crop_max_side.
+        w, h = image.size
+        factor = crop_max_side / max(w, h)
+        if factor < 1:
+            image.draft("RGB", (int(w * factor), int(h * factor)))
+    image = ImageOps.exif_transpose(image).convert("RGB")
+
+    original = _bounded(image, crop_max_side)
+    work = _bounded(original, work_max_side)
+
+    buffer = io.BytesIO()
+    work.save(buffer, format=fmt, quality=quality)
+    return PreparedImage(original, work, buffer.getvalue())
+
+
+def box_to_pixels(box, width, height):
+    """Map a normalized Clarifai (left, top, right, bottom) box to pixel coordinates."""
+    left, top, right, bottom = box
+    return int(left * width), int(top * height), int(right * width), int(bottom * height)
+
+
+def apply_matte(original, cutout):
+    """Return `original` as RGBA using the (possibly smaller) alpha matte of `cutout`."""
+    alpha = cutout.getchannel("A")
+    if alpha.size != original.size:
+        alpha = alpha.resize(original.size, Image.BILINEAR)
+    result = original.convert("RGBA")
+    result.putalpha(alpha)
+    return result
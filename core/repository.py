@@ -0,0 +1,129 @@
+"""Per-session, in-memory copy of a user's Firestore document.
+
+Streamlit reruns the whole page script on every widget interaction. Without
+this module, every click re-ran `where('username', '==', ...).get()` and
+downloaded the full wardrobe again. A WardrobeRepository downloads the
+document once and subscribes to it with `on_snapshot`. Writes from any page,
+from the Today's Drip browser code or from another device then arrive in the
+background, and reruns read from memory.
+
+The listener only holds a weak reference to its repository. When a session
+ends and its state is dropped, the repository is collected and its Watch
+stream unsubscribed, so abandoned tabs don't keep streams open.
+"""
+import logging
+import threading
+import weakref
+
+from core.colorindex import ColorIndex
+from core.phash import HashIndex
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = "wardrobe_repository"
+
+
+class WardrobeRepository:
+    """One user's document, kept fresh by a Firestore listener."""
+
+    def __init__(self, db, username, timeout=10.0):
+        self.username = username
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._snapshot = None
+        self._color_indexes = {}
+        self.stats = {"snapshots": 0, "served": 0}
+        self._run = 0
+        self._served_run = None
+
+        query = db.collection('users').where('username', '==', username).limit(1)
+        # A bound method would keep the repository alive from the listener thread.
+        callback = weakref.WeakMethod(self._on_snapshot)
+        self._watch = query.on_snapshot(lambda *args: (callback() or _ignore)(*args))
+        self._close = weakref.finalize(self, self._watch.unsubscribe)
+        if not self._ready.wait(timeout):
+            # Listener is slow to deliver the first snapshot; fall back to one direct read.
+            logger.warning("Wardrobe listener for %s timed out; reading once", username)
+            docs = query.get()
+            self._set(docs[0] if docs else None)
+
+    def _set(self, snapshot):
+        with self._lock:
+            self._snapshot = snapshot
+            self.stats["snapshots"] += 1
+        self._ready.set()
+
+    def _on_snapshot(self, docs, changes, read_time):
+        self._set(docs[0] if docs else None)
+
+    def begin_run(self):
+        """Mark a new page script run; reads are counted once per run."""
+        with self._lock:
+            self._run += 1
+
+    def _served(self):
+        with self._lock:
+            if self._served_run != self._run:
+                self._served_run = self._run
+                self.stats["served"] += 1
+            return self._snapshot
+
+    # --- reads ---
+    @property
+    def exists(self):
+        return self._snapshot is not None
+
+    @property
+    def ref(self):
+        """DocumentReference for writes, or None if the user has no document."""
+        snapshot = self._snapshot
+        return snapshot.reference if snapshot is not None else None
+
+    @property
+    def id(self):
+        snapshot = self._snapshot
+        return snapshot.id if snapshot is not None else None
+
+    def data(self):
+        """The latest document as a dict (empty if missing)."""
+        snapshot = self._served()
+        return (snapshot.to_dict() or {}) if snapshot is not None else {}
+
+    def items(self, collection):
+        return self.data().get(collection, {})
+
+    def item(self, collection, item_id):
+        return self.items(collection).get(item_id)
+
+    def hash_index(self):
+        return HashIndex.from_field(self.data().get("hashes"))
+
+    def color_index(self, collection):
+        """CIELAB nearest-color index for `collection`, synced incrementally with the latest snapshot."""
+        index = self._color_indexes.setdefault(collection, ColorIndex())
+        index.sync(self.items(collection))
+        return index
+
+    @property
+    def reads_saved(self):
+        """Script runs served from memory (each used to query Firestore once), minus listener downloads."""
+        return max(0, self.stats["served"] - self.stats["snapshots"])
+
+    def close(self):
+        self._close()
+
+
+def _ignore(*args):
+    pass
+
+
+def get_repository(session_state, db, username):
+    """The session's repository for `username`, opening (or replacing) the listener as needed."""
+    repo = session_state.get(SESSION_KEY)
+    if repo is None or repo.username != username:
+        if repo is not None:
+            repo.close()
+        repo = WardrobeRepository(db, username)
+        session_state[SESSION_KEY] = repo
+    repo.begin_run()
+    return repo
@@ -0,0 +1,149 @@
+"""Bounded scratch space for the few places that still need a real file.
+
+Pages keep uploads, audio and model outputs in memory. Only fallbacks need a
+path: a Gradio upload that can't go through memory, or the files
+gradio_client downloads. Those files are written here instead of leaking
+into /tmp or the working directory:
+
+- every owner gets its own directory under FASHN8_SCRATCH_DIR: one per
+  Streamlit session, plus a `shared` one for process-level workers. Concurrent
+  sessions never clobber each other;
+- total size is capped at FASHN8_SCRATCH_MB. The least recently used files
+  are removed first, using mtime as the clock as core.cache does;
+- a session's directory is removed when its session state is garbage-collected
+  (the session ended). Directories left behind by a previous process are swept
+  on startup.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = "scratch_space"
+
+
+class ScratchSpace:
+    """One owner's directory inside a ScratchManager."""
+
+    def __init__(self, manager, name):
+        self.manager = manager
+        self.directory = os.path.join(manager.root, name)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def keep(self, data, suffix=""):
+        """Write `data` to a new file and return its path; it lives until evicted or cleaned up."""
+        # A job may outlive its session; recreate the directory rather than fail (the startup sweep reclaims it).
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        self.manager.enforce_quota(protect=path)
+        return path
+
+    @contextmanager
+    def file(self, data, suffix=""):
+        """Path to a file holding `data`, removed when the block exits."""
+        path = self.keep(data, suffix)
+        try:
+            yield path
+        finally:
+            _remove(path)
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class ScratchManager:
+    def __init__(self, root, max_bytes, stale_after=24 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._sweep(stale_after)
+        self.shared = ScratchSpace(self, "shared")
+
+    def _sweep(self, stale_after):
+        """Drop session directories an earlier process left behind."""
+        cutoff = time.time() - stale_after
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith("session-") and os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def session(self):
+        """A fresh directory for one session."""
+        return ScratchSpace(self, f"session-{uuid.uuid4().hex[:16]}")
+
+    def _files(self):
+        entries = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def enforce_quota(self, protect=None):
+        """Delete least recently used files (never `protect`) until the scratch root fits the quota."""
+        with self._lock:
+            entries = self._files()
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                if path == protect:
+                    continue
+                _remove(path)
+                total -= size
+                if total <= self.max_bytes * 0.9:
+                    break
+            logger.info("Scratch space over quota; trimmed to %d bytes", total)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class _SessionHandle:
+    """Lives in session state; when the session is dropped, its directory goes with it."""
+
+    def __init__(self, space):
+        self.space = space
+        weakref.finalize(self, space.cleanup)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_scratch():
+    """Process-wide scratch manager."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ScratchManager(config.SCRATCH_DIR, config.SCRATCH_MB * 1024 * 1024)
+    return _manager
+
+
+def session_scratch(session_state):
+    """The calling session's ScratchSpace, created on first use and removed when the session ends."""
+    handle = session_state.get(SESSION_KEY)
+    if handle is None:
+        handle = session_state[SESSION_KEY] = _SessionHandle(get_scratch().session())
+    return handle.space
@@ -0,0 +1,188 @@
+"""Turn a garment caption into a short shopping-search query.
+
+Snap Shop used to send every caption to Gemini. The captions are short and
+repetitive ("a navy blue slim fit cotton shirt on a white background"), so
+the work is split into tiers:
+
+1. a local rule-based extractor pulls garment type, colors, materials and
+   style/fit/pattern keywords from a small vocabulary. When it finds exactly
+   one garment type and at least one color, its query is used as is;
+2. otherwise the Gemini result is looked up in the shared PipelineCache
+   (memory + disk), keyed by the normalized caption;
+3. only then is the remote refiner called, and its answer is cached.
+
+Per-tier counts are kept so the page can report how often the network call
+was skipped.
+"""
+import logging
+import re
+import threading
+
+from core.cache import content_key, get_cache
+
+logger = logging.getLogger(__name__)
+
+GARMENTS = {
+    "t shirt": "t-shirt", "tshirt": "t-shirt", "tee": "t-shirt", "polo": "polo shirt", "polo shirt": "polo shirt",
+    "shirt": "shirt", "button down shirt": "button-down shirt", "blouse": "blouse", "top": "top",
+    "tank top": "tank top", "crop top": "crop top", "sweater": "sweater", "jumper": "sweater",
+    "sweatshirt": "sweatshirt", "hoodie": "hoodie", "cardigan": "cardigan", "jacket": "jacket",
+    "denim jacket": "denim jacket", "bomber jacket": "bomber jacket", "blazer": "blazer", "coat": "coat",
+    "trench coat": "trench coat", "overcoat": "overcoat", "suit": "suit", "waistcoat": "waistcoat",
+    "vest": "vest", "kurta": "kurta", "dress": "dress", "gown": "gown", "frock": "frock", "saree": "saree",
+    "sari": "saree", "jumpsuit": "jumpsuit", "trousers": "trousers", "pants": "pants", "jeans": "jeans",
+    "chinos": "chinos", "cargo pants": "cargo pants", "joggers": "joggers", "sweatpants": "sweatpants",
+    "shorts": "shorts", "skirt": "skirt", "leggings": "leggings",
+}
+COLORS = {
+    "black", "white", "off white", "ivory", "cream", "grey", "gray", "charcoal", "silver", "navy",
+    "navy blue", "blue", "sky blue", "royal blue", "teal", "turquoise", "red", "maroon", "burgundy",
+    "wine", "pink", "magenta", "purple", "lavender", "violet", "green", "olive", "olive green",
+    "mint", "khaki", "beige", "tan", "camel", "brown", "chocolate", "yellow", "mustard", "gold",
+    "orange", "rust", "coral", "peach",
+}
+SHADES = {"light", "dark", "pale", "bright", "deep"}
+MATERIALS = {
+    "cotton", "linen", "denim", "silk", "satin", "wool", "woolen", "knit", "knitted", "leather",
+    "suede", "velvet", "corduroy", "chiffon", "polyester", "fleece", "twill", "tweed", "jersey",
+    "lace", "flannel", "chambray", "cashmere",
+}
+STYLES = {
+    "slim fit", "regular fit", "relaxed fit", "loose fit", "oversized", "skinny", "straight leg",
+    "wide leg", "high waisted", "cropped", "tapered", "striped", "pinstriped", "checked", "plaid",
+    "floral", "printed", "graphic", "polka dot", "embroidered", "ribbed", "button down", "collared",
+    "mandarin collar", "crew neck", "v neck", "turtleneck", "hooded", "long sleeve", "long sleeved",
+    "short sleeve", "short sleeved", "sleeveless", "double breasted", "formal", "casual", "distressed",
+    "ripped", "pleated",
+}
+# A color directly before one of these describes the scene or the wearer, not the garment.
+NOT_GARMENT = {
+    "background", "backdrop", "wall", "floor", "studio", "lighting", "light", "hair", "eyes", "skin",
+    "shoes", "sneakers", "boots", "belt", "bag", "watch", "surface", "table",
+}
+MAX_WORDS = 3
+MAX_COLORS = 2
+VOCABULARY = GARMENTS.keys() | COLORS | MATERIALS | STYLES
+
+
+def normalize(caption):
+    """Lowercase words only, single-spaced, hyphens treated as spaces (`T-Shirt` == `t shirt`)."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", (caption or "").lower()).split())
+
+
+class Extraction:
+    """Keywords found in one caption, in caption order."""
+
+    def __init__(self):
+        self.garments = []
+        self.colors = []
+        self.materials = []
+        self.styles = []
+
+    @property
+    def confident(self):
+        """One unambiguous garment type and a color: enough for a good search without an LLM."""
+        return len(self.garments) == 1 and 0 < len(self.colors) <= MAX_COLORS
+
+    @property
+    def query(self):
+        return " ".join(self.colors + self.materials[:2] + self.styles[:3] + self.garments[:1])
+
+
+def _add(values, value):
+    if value not in values:
+        values.append(value)
+
+
+def extract(caption):
+    """Greedy longest-phrase scan of the normalized caption against the vocabulary."""
+    words = normalize(caption).split()
+    found = Extraction()
+    n = 0
+    while n < len(words):
+        for size in range(min(MAX_WORDS, len(words) - n), 0, -1):
+            phrase = " ".join(words[n:n + size])
+            if phrase in VOCABULARY:
+                break
+        else:
+            n += 1
+            continue
+        following = words[n + size] if n + size < len(words) else ""
+        if phrase in GARMENTS:
+            _add(found.garments, GARMENTS[phrase])
+        elif phrase in COLORS:
+            if following not in NOT_GARMENT:
+                shade = words[n - 1] if n and words[n - 1] in SHADES else ""
+                _add(found.colors, f"{shade} {phrase}".strip())
+        elif phrase in MATERIALS:
+            _add(found.materials, phrase)
+        else:
+            _add(found.styles, phrase)
+        n += size
+    return found
+
+
+class QueryRefiner:
+    """Local extraction, then cached, then remote refinement; counts which tier answered."""
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.tier_counts = {"local": 0, "cached": 0, "remote": 0, "failed": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, tier):
+        with self._lock:
+            self.tier_counts[tier] += 1
+
+    def refine(self, caption, remote):
+        """Search query for `caption`; `remote(caption)` is only called when nothing local answers.
+
+        If the remote call fails or answers with nothing, the caption itself is returned and
+        nothing is cached.
+        """
+        extraction = extract(caption)
+        if extraction.confident:
+            self._count("local")
+            return extraction.query
+
+        cache = self.cache if self.cache is not None else get_cache()
+        key = content_key(normalize(caption))
+        cached = cache.get("query", key)
+        if cached is not None:
+            self._count("cached")
+            return cached
+        def compute():
+            query = (remote(caption) or "").strip()
+            if not query:
+                raise ValueError("Remote refiner returned an empty query")
+            return query
+
+        try:
+            query = cache.get_or_compute("query", key, compute)
+        except Exception:
+            logger.warning("Remote query refinement failed; using the caption", exc_info=True)
+            self._count("failed")
+            return caption
+        self._count("remote")
+        return query
+
+    def stats(self):
+        """Per-tier counts for this process, plus the share answered without a remote call."""
+        counts = dict(self.tier_counts)
+        total = sum(counts.values())
+        counts["hit_rate"] = (counts["local"] + counts["cached"]) / total if total else 0.0
+        return counts
+
+
+_refiner = None
+_refiner_lock = threading.Lock()
+
+
+def get_query_refiner():
+    """Process-wide refiner backed by the shared pipeline cache."""
+    global _refiner
+    if _refiner is None:
+        with _refiner_lock:
+            if _refiner is None:
+                _refiner = QueryRefiner()
+    return _refiner
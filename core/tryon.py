@@ -0,0 +1,316 @@
+"""Background virtual try-on jobs on the fashn-vton Gradio Space.
+
+A try-on takes tens of seconds on the Space. TryOnQueue runs each request on
+a bounded worker pool with `Client.submit`, so the page script never blocks.
+Each job gets an id, a status message the page can poll, cancellation, and
+output bytes kept in process memory. Results therefore survive reruns, and a
+session can queue several garments and keep browsing.
+
+The person photo is normalized once per session, with prepare_person, and
+uploaded to the Space once. Later jobs for the same photo reuse that file
+reference and only transfer the garment. If a reused reference fails, the
+photo is uploaded again and the job is retried once, but only when the
+Space reports that file missing; quota and other Space errors fail the job.
+
+Finished outputs are also stored in a dedicated, size-bounded PipelineCache,
+keyed by the person and garment bytes plus the request parameters. Pressing
+Generate again, or flipping the category back, returns the stored image
+without calling the Space.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from gradio_client import Client, handle_file
+
+from core import config
+from core.cache import PipelineCache, content_key
+from core.gradio_io import TempFileHandle, upload_bytes
+from core.preprocess import prepare_image
+from core.scratch import get_scratch
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+# Error text that means the Space no longer has a file we uploaded earlier.
+MISSING_UPLOAD_MARKERS = (
+    "not in the upload folder", "cannot find file", "file not found", "no such file", "does not exist",
+    "has expired",
+)
+
+
+class TryOnJob:
+    def __init__(self, person, garment, category, garment_photo_type="model", label="", scratch=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.person = person
+        self.garment = garment
+        self.category = category
+        self.garment_photo_type = garment_photo_type
+        self.label = label
+        self.scratch = scratch
+        self.key = content_key(person, garment, category, garment_photo_type)
+        self.status = QUEUED
+        self.message = "Waiting for a free slot"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._future = None
+        self._cancelled = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    def cancel(self):
+        """Stop the job; a queued job never starts, a running one is abandoned at the next poll."""
+        if not self.active:
+            return False
+        self._cancelled.set()
+        if self._future is not None:
+            self._future.cancel()
+        self.status, self.message, self.finished = CANCELLED, "Cancelled", time.time()
+        return True
+
+
+def _describe(update):
+    """Short human-readable status for a gradio_client StatusUpdate."""
+    rank, queue_size = getattr(update, "rank", None), getattr(update, "queue_size", None)
+    if rank is not None and queue_size:
+        return f"Queued on the Space ({rank + 1} of {queue_size})"
+    progress = getattr(update, "progress_data", None)
+    if progress and getattr(progress[-1], "length", None):
+        return f"Generating ({progress[-1].index}/{progress[-1].length})"
+    eta = getattr(update, "eta", None)
+    return f"Generating (~{eta:.0f}s left)" if eta else "Generating"
+
+
+def _filename(stem, data):
+    """Filename with an extension matching the image bytes, so the Space decodes it correctly."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return stem + ".png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return stem + ".webp"
+    return stem + ".jpg"
+
+
+def prepare_person(source, max_side=None, quality=None):
+    """Person photo as a bounded, EXIF-upright JPEG at the resolution the try-on model works at."""
+    max_side = max_side or config.TRYON_PERSON_MAX_SIDE
+    return prepare_image(
+        source, work_max_side=max_side, crop_max_side=max_side, fmt="JPEG",
+        quality=quality or config.TRYON_PERSON_QUALITY,
+    ).payload
+
+
+def _upload_missing(error):
+    """True if a remote error says an uploaded file is gone; quota and Space errors are not retried."""
+    message = str(error).lower()
+    return any(marker in message for marker in MISSING_UPLOAD_MARKERS)
+
+
+def _read_output(result):
+    """The try-on endpoint returns a file path (possibly wrapped); load it into memory."""
+    if isinstance(result, (list, tuple)) and result:
+        result = result[0]
+    if isinstance(result, dict):
+        result = result.get("path") or result.get("url")
+    if not result:
+        raise RuntimeError("API returned empty result.")
+    with open(result, "rb") as f:
+        data = f.read()
+    try:
+        # gradio_client downloads outputs into the shared scratch dir; the bytes are all we keep.
+        os.remove(result)
+    except OSError:
+        pass
+    return data
+
+
+class TryOnQueue:
+    def __init__(self, space, max_jobs=2, timeout=300, history=200, hf_token=None, cache=None, upload_ttl=1800):
+        self.space = space
+        self.timeout = timeout
+        self.history = history
+        self.hf_token = hf_token
+        self.cache = cache
+        self.cache_stats = {"hits": 0, "misses": 0}
+        # Person photos already on the Space: content hash -> (file reference, upload time)
+        self.upload_ttl = upload_ttl
+        self._uploads = {}
+        self.upload_stats = {"uploaded": 0, "reused": 0}
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="tryon")
+        self._local = threading.local()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _client(self):
+        # One Client per worker thread, reused across that worker's jobs
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = Client(
+                self.space, hf_token=self.hf_token, verbose=False, download_files=get_scratch().shared.directory
+            )
+        return client
+
+    def _upload(self, client, stack, data, filename, scratch=None):
+        """Return `(file reference, reusable)`; temp-file fallbacks die with `stack` and can't be reused."""
+        try:
+            return upload_bytes(client, data, filename), True
+        except Exception:
+            logger.warning("In-memory upload failed; falling back to a temp file", exc_info=True)
+            return stack.enter_context(TempFileHandle(data, os.path.splitext(filename)[1], scratch)), False
+
+    def _person_ref(self, client, stack, data, reuse=True, scratch=None):
+        """Reference to the person photo on the Space, uploading it only if no fresh copy is known.
+
+        Returns `(reference, was_reused)`.
+        """
+        key = content_key(data)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._uploads.get(key)
+            if reuse and entry and now - entry[1] < self.upload_ttl:
+                self.upload_stats["reused"] += 1
+                return entry[0], True
+        ref, reusable = self._upload(client, stack, data, _filename("person", data), scratch)
+        with self._lock:
+            self.upload_stats["uploaded"] += 1
+            if reusable:
+                for stale in [k for k, (_, at) in self._uploads.items() if now - at >= self.upload_ttl]:
+                    del self._uploads[stale]
+                self._uploads[key] = (ref, now)
+        return ref, False
+
+    def _generate(self, job, client, reuse_person):
+        """One remote try-on; returns the output bytes, or None if the job was cancelled."""
+        with ExitStack() as stack:
+            person_ref, reused = self._person_ref(client, stack, job.person, reuse_person, job.scratch)
+            if isinstance(job.garment, str):
+                # Wardrobe garments are already hosted; the Space fetches them by URL.
+                garment_ref = handle_file(job.garment)
+            else:
+                garment_ref, _ = self._upload(
+                    client, stack, job.garment, _filename("garment", job.garment), job.scratch
+                )
+            try:
+                remote = client.submit(
+                    person_image=person_ref,
+                    garment_image=garment_ref,
+                    category=job.category,
+                    garment_photo_type=job.garment_photo_type,
+                    api_name="/try_on",
+                )
+                deadline = time.monotonic() + self.timeout
+                while not remote.done():
+                    if job._cancelled.is_set():
+                        remote.cancel()
+                        return None
+                    if time.monotonic() > deadline:
+                        remote.cancel()
+                        raise TimeoutError(f"Try-on timed out after {self.timeout}s")
+                    job.message = _describe(remote.status())
+                    time.sleep(0.5)
+                result = remote.result()
+            except TimeoutError:
+                raise
+            except Exception as e:
+                if not reused or not _upload_missing(e):
+                    raise
+                # The Space cleaned up the shared upload; retry once with a fresh copy.
+                logger.info("Try-on with a reused person upload failed; re-uploading", exc_info=True)
+                with self._lock:
+                    self._uploads.pop(content_key(job.person), None)
+            else:
+                return _read_output(result)
+        return self._generate(job, client, reuse_person=False)
+
+    def _run(self, job):
+        if job._cancelled.is_set():
+            return
+        job.status, job.message = RUNNING, "Uploading images"
+        try:
+            result = self._generate(job, self._client(), reuse_person=True)
+            if result is None or job._cancelled.is_set():
+                return
+            job.result = result
+            job.status, job.message = DONE, "Done"
+            if self.cache is not None:
+                self.cache.set("tryon", job.key, result)
+        except Exception as e:
+            if job._cancelled.is_set():
+                return
+            logger.warning("Try-on job %s failed", job.id, exc_info=True)
+            job.status, job.message, job.error = FAILED, "Failed", str(e)
+        finally:
+            if job._cancelled.is_set():
+                job.status, job.message = CANCELLED, "Cancelled"
+            job.finished = job.finished or time.time()
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+    def submit(self, person, garment, category, garment_photo_type="model", label="", scratch=None):
+        """Queue a try-on and return its TryOnJob immediately.
+
+        `person` is image bytes; `garment` is image bytes or the URL of a hosted image.
+        `scratch` is the caller's ScratchSpace for any temp-file fallback.
+        """
+        job = TryOnJob(person, garment, category, garment_photo_type, label, scratch)
+        cached = self.cache.get("tryon", job.key) if self.cache is not None else None
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+            self.cache_stats["hits" if cached is not None else "misses"] += 1
+        if cached is not None:
+            job.result = cached
+            job.status, job.message, job.finished = DONE, "Done (cached)", time.time()
+        else:
+            job._future = self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        return job.cancel() if job else False
+
+    def stats(self):
+        """Result-cache hits and misses for this process, plus the hit rate."""
+        hits, misses = self.cache_stats["hits"], self.cache_stats["misses"]
+        return {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_tryon_queue(hf_token=None):
+    """Process-wide try-on queue; `hf_token` is only used when it is first created."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = TryOnQueue(
+                    config.TRYON_SPACE,
+                    config.TRYON_MAX_JOBS,
+                    config.TRYON_TIMEOUT_S,
+                    config.TRYON_JOB_HISTORY,
+                    hf_token=hf_token,
+                    cache=PipelineCache(
+                        os.path.join(config.CACHE_DIR, "tryon"),
+                        max_memory_items=config.TRYON_CACHE_MEMORY_ITEMS,
+                        max_disk_bytes=config.TRYON_CACHE_DISK_MB * 1024 * 1024,
+                    ),
+                    upload_ttl=config.TRYON_UPLOAD_TTL_S,
+                )
+    return _queue
@@ -0,0 +1,120 @@
+"""Firestore wardrobe writes and item views shared by the pages.
+
+Items live in the `shirts` / `pant` maps of the user document. New items are
+written with field-path updates (`shirts.<id>`) inside a transaction that only
+reads the per-user `counters` map, so adding an item costs the same regardless
+of wardrobe size, concurrent uploads never collide, and IDs are never reused
+after a deletion.
+
+Items carrying a perceptual hash (`phash`) are also listed in the `hashes`
+map (`"<collection>_<id>" -> hex`), the compact index Dress++ checks (through
+the session's WardrobeRepository) to spot duplicates. Document reads go
+through core.repository.
+"""
+from firebase_admin import firestore
+
+# Dress++ categories map onto these Firestore map fields ('pant' matches the DB schema).
+COLLECTIONS = {"top": "shirts", "bottom": "pant"}
+
+
+def field_path(*parts):
+    """Quoted Firestore field path, e.g. field_path("shirts", "12") -> "shirts.`12`"."""
+    return firestore.FieldPath(*parts).to_api_repr()
+
+
+def get_user_ref(db, username):
+    """Return the user's DocumentReference without downloading the wardrobe maps."""
+    query = db.collection('users').where('username', '==', username).select(['username']).limit(1)
+    user_docs = query.get()
+    return user_docs[0].reference if user_docs else None
+
+
+def _max_numeric_key(mapping):
+    return max((int(k) for k in mapping if str(k).isdigit()), default=0)
+
+
+def _sort_key(item_id):
+    return (0, int(item_id), "") if str(item_id).isdigit() else (1, 0, str(item_id))
+
+
+# Fields the carousel needs per item; masters and hashes stay on the server.
+CARD_FIELDS = ("desc", "hex", "thumb")
+
+
+def card(entry):
+    """Slim view of an item for the browser, falling back to the master when no thumbnail exists."""
+    view = {field: entry[field] for field in CARD_FIELDS if entry.get(field)}
+    if "thumb" not in view and entry.get("img"):
+        view["thumb"] = entry["img"]
+    return view
+
+
+def paginate(mapping, page, page_size):
+    """Return `(cards, page, page_count)` for one page of a wardrobe map, oldest items first.
+
+    `page` is clamped into range, so a stale page number after deletions still lands on real items.
+    """
+    ids = sorted(mapping, key=_sort_key)
+    page_count = max(1, -(-len(ids) // page_size))
+    page = min(max(page, 0), page_count - 1)
+    start = page * page_size
+    cards = {item_id: card(mapping[item_id]) for item_id in ids[start:start + page_size]}
+    return cards, page, page_count
+
+
+@firestore.transactional
+def _add_items_in_transaction(transaction, user_ref, items):
+    counts = {}
+    for collection, _ in items:
+        counts[collection] = counts.get(collection, 0) + 1
+
+    snapshot = user_ref.get(field_paths=["counters"], transaction=transaction)
+    counters = (snapshot.to_dict() or {}).get("counters", {})
+
+    last_ids = {}
+    for collection in counts:
+        if collection in counters:
+            last_ids[collection] = int(counters[collection])
+        else:
+            # One-time migration for wardrobes created before the counter existed.
+            existing = user_ref.get(field_paths=[collection], transaction=transaction)
+            last_ids[collection] = _max_numeric_key((existing.to_dict() or {}).get(collection, {}))
+
+    updates = {}
+    keys = []
+    for collection, entry in items:
+        last_ids[collection] += 1
+        new_key = str(last_ids[collection])
+        updates[field_path(collection, new_key)] = entry
+        if entry.get("phash"):
+            updates[field_path("hashes", f"{collection}_{new_key}")] = entry["phash"]
+        keys.append((collection, new_key))
+    for collection, last_id in last_ids.items():
+        updates[field_path("counters", collection)] = last_id
+    # Any add/delete bumps the wardrobe version, which invalidates cached match rankings.
+    updates["version"] = firestore.Increment(1)
+
+    transaction.update(user_ref, updates)
+    return keys
+
+
+def add_items(db, username, items, user_ref=None):
+    """Add several `(collection, entry)` pairs to a user's wardrobe in one transactional write.
+
+    Returns the `(collection, key)` assigned to each item, in input order.
+    """
+    if user_ref is None:
+        user_ref = get_user_ref(db, username)
+    if user_ref is None:
+        raise LookupError("User document not found!")
+    return _add_items_in_transaction(db.transaction(), user_ref, list(items))
+
+
+def add_item(db, username, collection, entry, user_ref=None):
+    """Add one entry and return its new key."""
+    return add_items(db, username, [(collection, entry)], user_ref=user_ref)[0][1]
+
+
+def save_week(user_ref, week):
+    """Write several planner days in a single update; `week` maps day -> {"shirt", "pant", "locked"}."""
+    user_ref.update({field_path("week", day): outfit for day, outfit in week.items()})
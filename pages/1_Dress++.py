@@ -1,8 +1,6 @@
 import os
-import io
-import tempfile
 import json
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 1. SET THIS FIRST (Before any other imports)
 if "HOME" not in os.environ:
@@ -10,15 +8,27 @@ if "HOME" not in os.environ:
     os.environ["HOME"] = os.environ.get("USERPROFILE", os.path.expanduser("~"))
 
 import streamlit as st
-import numpy as np
 import cloudinary
 import cloudinary.uploader
 import firebase_admin
 from firebase_admin import credentials, firestore
-from gradio_client import Client, handle_file
-from PIL import Image, ImageDraw
-from rembg import remove
-from clarifai.client.model import Model
+from PIL import ImageDraw
+from core import config
+from core.captioning import caption_image, get_caption_pool
+from core.compat import record_added
+from core.descriptors import describe, to_field
+from core.detection import get_detector
+from core.media import upload_garment
+from core.phash import dhash, to_hex
+from core.pipeline import (
+    cached_caption,
+    cached_detect_regions,
+    cached_dominant_color,
+    cached_remove_background,
+)
+from core.preprocess import apply_matte, box_to_pixels, prepare_image
+from core.repository import get_repository
+from core.wardrobe import COLLECTIONS, add_item, add_items
 
 st.title("Dress++")
 
@@ -84,50 +94,93 @@ if st.session_state.get('authentication_status'):
         st.session_state['show_signup_form'] = False
         st.rerun()
 
+# Session-wide listener-backed copy of the user document (hash index, existing items, doc ref)
+wardrobe_repo = get_repository(st.session_state, db, st.session_state['username'])
+st.sidebar.caption(f"⚡ {wardrobe_repo.reads_saved} Firestore reads saved this session")
+
 # Streamlit UI
 st.write("Add your outfit to Find AI Match for your dress in Today's Drip.")
 uploaded_file = st.file_uploader("Upload a clothing image", type=["jpg", "jpeg", "png", "webp","avif"])
 
-# Color extraction function
-def get_dominant_color(image_rgba, alpha_threshold=30, min_brightness=20):
-    data = np.array(image_rgba)
-    r, g, b, a = data[:, :, 0], data[:, :, 1], data[:, :, 2], data[:, :, 3]
-    brightness = 0.299 * r + 0.587 * g + 0.114 * b
-    mask = (a > alpha_threshold) & (brightness > min_brightness)
-    if np.count_nonzero(mask) == 0:
-        return "#000000", "No visible color"
-    filtered_pixels = data[mask]
-    rgb_values = [tuple(pixel[:3]) for pixel in filtered_pixels]
-    most_common = Counter(rgb_values).most_common(1)[0][0]
-    hex_color = '#%02x%02x%02x' % most_common
-    return hex_color, "Dominant"
-
-# Background removal
+# Background removal (cached by image content, so reruns don't redo it)
 def remove_background_locally(image_bytes):
-    output_bytes = remove(image_bytes)
-    return Image.open(io.BytesIO(output_bytes)).convert("RGBA")
+    return cached_remove_background(image_bytes)
+
+# Clarifai apparel detection, returned as plain region dicts
+def detect_apparel(image_bytes):
+    # Shared, process-wide client: the gRPC channel is reused across reruns and sessions
+    return get_detector(st.secrets["clarifai"]["pat"]).detect(image_bytes)
+
+# Caption a crop with the Gradio image-to-prompt Space (pooled client, in-memory upload)
+def generate_caption(image):
+    return caption_image(image)
+
+# Caption + Cloudinary upload for one detected item; safe to run in a worker thread
+def prepare_entry(item, username):
+    # 1-2. Get the caption from the AI model (cached per crop)
+    caption = cached_caption(item["crop"], generate_caption)
+
+    # 3. Upload a WebP master and thumbnail to Cloudinary
+    urls = upload_garment(
+        item["crop"],
+        public_id=f"{username}_{item['label']}_{item['hex'].replace('#', '')}_{item['index']}"
+    )
+
+    # Format the new entry to match your DB structure
+    return {
+        "desc": caption,
+        "hex": item["hex"],
+        "img": urls["img"],
+        "thumb": urls["thumb"],
+        "phash": to_hex(item["phash"]),
+        # Color histogram + texture descriptor for Snap Shop's visual similarity search
+        "vis": to_field(describe(item["crop"]))
+    }
+
+# Process every item concurrently, then commit all of them in one Firestore write
+def upload_all(items):
+    username = st.session_state['username']
+    progress = st.progress(0.0, text=f"Uploading 0/{len(items)} items...")
+    statuses = [st.empty() for _ in items]
+    for status, item in zip(statuses, items):
+        status.info(f"⏳ {item['label'].capitalize()}: captioning and uploading...")
+
+    entries = [None] * len(items)
+    done = 0
+    with ThreadPoolExecutor(max_workers=config.UPLOAD_WORKERS) as executor:
+        futures = {executor.submit(prepare_entry, item, username): n for n, item in enumerate(items)}
+        for future in as_completed(futures):
+            n = futures[future]
+            label = items[n]["label"].capitalize()
+            try:
+                entries[n] = future.result()
+                statuses[n].success(f"✅ {label}: {entries[n]['desc'][:80]}")
+            except Exception as e:
+                statuses[n].error(f"❌ {label}: {e}")
+            done += 1
+            progress.progress(done / len(items), text=f"Uploading {done}/{len(items)} items...")
+
+    ready = [(COLLECTIONS[item["category"]], entry) for item, entry in zip(items, entries) if entry]
+    if ready:
+        keys = add_items(db, username, ready, user_ref=wardrobe_repo.ref)
+        # Score just the new rows/columns into the user's compatibility matrix
+        record_added(username, [(c, k, entry["hex"]) for (c, k), (_, entry) in zip(keys, ready)])
+        st.success(f"Uploaded {len(ready)} of {len(items)} items to your wardrobe!")
+    progress.empty()
 
 # Main process
 if uploaded_file:
-    original_image = Image.open(uploaded_file).convert("RGB")
+    # Bounded draft-mode decode plus a compact JPEG payload for detection and matting
+    prepared = prepare_image(uploaded_file)
+    original_image = prepared.original
     width, height = original_image.size
-
-    # Convert image to bytes
-    buffer = io.BytesIO()
-    original_image.save(buffer, format="PNG")
-    image_bytes = buffer.getvalue()
+    image_bytes = prepared.payload
 
     try:
         with st.spinner("Processing image..."):
-            bg_removed_image = remove_background_locally(image_bytes)
-            
-            # Clarifai setup securely via st.secrets
-            pat = st.secrets["clarifai"]["pat"]  
-            apparel_model_url = "https://clarifai.com/clarifai/main/models/apparel-detection"
-            apparel_model = Model(url=apparel_model_url, pat=pat)
-
-            prediction = apparel_model.predict_by_bytes(image_bytes, input_type="image")
-            regions = prediction.outputs[0].data.regions
+            # Matte is computed on the small payload and applied to the larger image for crops
+            bg_removed_image = apply_matte(original_image, remove_background_locally(image_bytes))
+            regions = cached_detect_regions(image_bytes, detect_apparel)
 
         if not regions:
             st.warning("No clothing items detected.")
@@ -135,14 +188,11 @@ if uploaded_file:
             draw = ImageDraw.Draw(original_image)
             st.subheader("👕 Detected Items")
 
-            # Create two columns for displaying items
-            cols = st.columns(2)
-            col_idx = 0  # Track which column we're currently using
-
+            # Collect every qualifying region before rendering
+            items = []
             for i, region in enumerate(regions):
-                concept = region.data.concepts[0]
-                label = concept.name
-                confidence = concept.value
+                label = region["label"]
+                confidence = region["confidence"]
 
                 if confidence < 0.6:
                     continue
@@ -154,86 +204,84 @@ if uploaded_file:
                 else:
                     continue
 
-                box = region.region_info.bounding_box
-                left = int(box.left_col * width)
-                top = int(box.top_row * height)
-                right = int(box.right_col * width)
-                bottom = int(box.bottom_row * height)
+                left, top, right, bottom = box_to_pixels(region["box"], width, height)
 
                 # Crop from background-removed image
                 cropped = bg_removed_image.crop((left, top, right, bottom))
-                hex_crop, _ = get_dominant_color(cropped)
+                items.append({
+                    "index": i,
+                    "label": label,
+                    "category": category,
+                    "crop": cropped,
+                    "hex": cached_dominant_color(cropped),
+                    "phash": dhash(cropped),
+                })
+
+            # Check every crop against the user's perceptual-hash index before any expensive work
+            if items:
+                hash_index = wardrobe_repo.hash_index()
+                for item in items:
+                    collection_name = COLLECTIONS[item["category"]]
+                    matches = hash_index.nearest(item["phash"], collection=collection_name)
+                    if matches:
+                        # Same shape is not enough: a navy and a red shirt of the same cut share a dHash
+                        same_color = {
+                            item_id for item_id, _ in wardrobe_repo.color_index(collection_name).nearest(
+                                item["hex"], k=len(matches), max_delta_e=config.DUPLICATE_MAX_DELTA_E,
+                                only=[key[1] for key, _ in matches],
+                            )
+                        }
+                        matches = [(key, distance) for key, distance in matches if key[1] in same_color]
+                    item["duplicate_of"] = matches[0][0] if matches else None
+
+            duplicates = [item for item in items if item["duplicate_of"]]
+            include_duplicates = False
+            if duplicates:
+                include_duplicates = st.checkbox(
+                    f"Include {len(duplicates)} item(s) that look like ones already in your wardrobe"
+                )
+            to_upload = [item for item in items if include_duplicates or not item["duplicate_of"]]
+
+            if to_upload and st.button(f"⬆️ Upload all {len(to_upload)} detected items", use_container_width=True):
+                upload_all(to_upload)
+
+            # Create two columns for displaying items
+            cols = st.columns(2)
+
+            for col_idx, item in enumerate(items):
+                label = item["label"]
 
                 # Display in alternating columns
-                with cols[col_idx]:
-                    st.image(cropped, caption=f"{label.capitalize()} Region", width=200)
+                with cols[col_idx % 2]:
+                    st.image(item["crop"], caption=f"{label.capitalize()} Region", width=200)
+
+                    # Offer the existing item instead of silently adding a duplicate
+                    button_label = f"Upload {label.capitalize()}"
+                    if item["duplicate_of"]:
+                        collection_name, item_id = item["duplicate_of"]
+                        existing = wardrobe_repo.item(collection_name, item_id) or {}
+                        st.info("This looks like an item already in your wardrobe.")
+                        if existing.get("thumb") or existing.get("img"):
+                            st.image(existing.get("thumb") or existing["img"], caption="Already saved", width=120)
+                        button_label = f"Upload {label.capitalize()} anyway"
                     
                     # Add upload button for each detected item with a unique key
-                    if st.button(f"Upload {label.capitalize()}", key=f"upload_{i}_{label}"):
+                    if st.button(button_label, key=f"upload_{item['index']}_{label}"):
                         with st.spinner("Generating description and uploading..."):
-                            
-                            # 1. Save cropped image to a temporary file for the Gradio client
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                                cropped.save(temp_file.name)
-                                temp_path = temp_file.name
-                            
-                            # 2. Get the caption from the AI model
-                            client = Client("ovi054/image-to-prompt")
-                            image_for_client = handle_file(temp_path)
-                            caption = client.predict(
-                                image=image_for_client,
-                                api_name="/predict"
-                            )
-                            
-                            # Clean up the temporary file
-                            os.remove(temp_path)
-
-                            # 3. Upload to Cloudinary
-                            buffer = io.BytesIO()
-                            cropped.save(buffer, format="PNG")
-                            buffer.seek(0)
-                            upload_result = cloudinary.uploader.upload(
-                                buffer,
-                                folder="fashion8",
-                                public_id=f"{st.session_state['username']}_{label}_{hex_crop.replace('#', '')}_{i}"
-                            )
-                            image_url = upload_result['secure_url']
-                            
-                            # 4. Update Firestore
-                            users_ref = db.collection('users')
-                            query = users_ref.where('username', '==', st.session_state['username']).limit(1)
-                            user_docs = query.get()
-                            
-                            if not user_docs:
-                                st.error("User document not found!")
-                                st.stop()
-                            
-                            user_doc = user_docs[0]
-                            user_ref = user_doc.reference
-
-                            # Ensure we use 'pant' to match your DB schema exactly
-                            collection_name = "shirts" if category == "top" else "pant"
-                            current_data = user_doc.to_dict().get(collection_name, {})
-                            
-                            # Calculate the new key based on map length + 1
-                            new_key = str(len(current_data) + 1)
-                            
-                            # Format the new entry to match your DB structure
-                            current_data[new_key] = {
-                                "desc": caption,
-                                "hex": hex_crop,
-                                "img": image_url
-                            }
-                            
-                            # Update the document with the new item mapping
-                            user_ref.update({
-                                collection_name: current_data
-                            })
-                            
+                            entry = prepare_entry(item, st.session_state['username'])
+                            collection_name = COLLECTIONS[item["category"]]
+                            new_key = add_item(db, st.session_state['username'], collection_name, entry, user_ref=wardrobe_repo.ref)
+                            record_added(st.session_state['username'], [(collection_name, new_key, entry["hex"])])
                             st.success("Uploaded Successfully!")
-                
-                # Toggle between columns (0 and 1)
-                col_idx = (col_idx + 1) % 2
 
     except Exception as e:
         st.error(f"❌ Error: {e}")
+
+# Caption latency breakdown for the shared client pool
+caption_stats = get_caption_pool().stats()
+if caption_stats["calls"]:
+    with st.sidebar.expander("Caption latency"):
+        st.caption(f"Average over the last {caption_stats['calls']} captions")
+        st.write(f"Client setup: {caption_stats['setup'] * 1000:.0f} ms")
+        st.write(f"Image upload: {caption_stats['upload'] * 1000:.0f} ms")
+        st.write(f"Inference: {caption_stats['inference'] * 1000:.0f} ms")
@@ -5,6 +5,12 @@ from firebase_admin import credentials, firestore
 import json
 import datetime
 
+from core import config
+from core.compat import get_matrix
+from core.planner import DAYS, plan_week
+from core.repository import get_repository
+from core.wardrobe import card, paginate, save_week
+
 # --- Page Config MUST be first ---
 st.set_page_config(page_title="Today's Drip", layout="wide")
 
@@ -55,28 +61,100 @@ if st.session_state.get('authentication_status'):
         st.rerun()
 
 # --- Fetch clothing data & DOCUMENT ID ---
-users_ref = db.collection('users')
-query = users_ref.where('username', '==', st.session_state['username']).limit(1)
-user_docs = query.get()
+# Served from the session's listener-backed copy instead of a Firestore query per rerun
+wardrobe_repo = get_repository(st.session_state, db, st.session_state['username'])
 
-if not user_docs:
+if not wardrobe_repo.exists:
     st.error("No clothing data found for this user.")
     st.stop()
 
 # Get the exact document ID to pass to the frontend
-user_doc_id = user_docs[0].id 
-user_data = user_docs[0].to_dict()
+user_doc_id = wardrobe_repo.id
+user_data = wardrobe_repo.data()
+st.sidebar.caption(f"⚡ {wardrobe_repo.reads_saved} Firestore reads saved this session")
 
 # Match exact keys from your Firestore schema
 shirts_data = user_data.get("shirts", {})
 pants_data = user_data.get("pant", {}) # DB uses "pant"
 
+# --- Wardrobe browser: category + page are picked here, only that page goes to the browser ---
+category = st.radio("Wardrobe", ["Shirts", "Pants"], horizontal=True, label_visibility="collapsed")
+side = category.lower()
+opposite_side = "pants" if side == "shirts" else "shirts"
+side_data, opposite_data = (shirts_data, pants_data) if side == "shirts" else (pants_data, shirts_data)
+
+page_key = f"drip_page_{side}"
+page_items, page, page_count = paginate(side_data, st.session_state.get(page_key, 0), config.WARDROBE_PAGE_SIZE)
+st.session_state[page_key] = page
+
+if page_count > 1:
+    prev_col, label_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("← Previous", use_container_width=True, disabled=page == 0):
+        st.session_state[page_key] = page - 1
+        st.rerun()
+    label_col.markdown(
+        f"<div style='text-align:center; padding-top:8px;'>Page {page + 1} of {page_count} · {len(side_data)} {side}</div>",
+        unsafe_allow_html=True,
+    )
+    if next_col.button("Next →", use_container_width=True, disabled=page == page_count - 1):
+        st.session_state[page_key] = page + 1
+        st.rerun()
+
+# Persisted shirt x pant compatibility matrix: syncing only scores added items and drops deleted ones.
+# The LLM only sees each item's top-k from it, so the browser only needs those counterparts.
+compat_matrix = get_matrix(st.session_state['username'], shirts_data, pants_data)
+local_rank = {side: {item_id: compat_matrix.ranked(side, item_id, k=config.MATCH_SHORTLIST_K) for item_id in page_items}}
+candidate_ids = {other_id for shortlist in local_rank[side].values() for other_id, _, _ in shortlist}
+candidate_items = {other_id: card(opposite_data[other_id]) for other_id in candidate_ids if other_id in opposite_data}
+
+# --- Plan my week: one local solve over the matrix, one Firestore write ---
+week = user_data.get("week", {})
+with st.expander("🗓️ Plan my week"):
+    locked_days = st.multiselect(
+        "Keep these days as they are",
+        DAYS,
+        default=[day for day in DAYS if week.get(day, {}).get("locked")],
+        format_func=str.title,
+    )
+    if st.button("✨ Plan my week", use_container_width=True):
+        locked = {day: week.get(day, {}) for day in locked_days}
+        plan = plan_week(compat_matrix, locked)
+        new_week = {day: {"shirt": outfit["shirt"], "pant": outfit["pant"], "locked": False} for day, outfit in plan.items()}
+        for day in locked_days:
+            new_week[day] = {"shirt": locked[day].get("shirt", ""), "pant": locked[day].get("pant", ""), "locked": True}
+        try:
+            save_week(wardrobe_repo.ref, new_week)
+            week.update(new_week)
+            st.session_state["week_reasons"] = {day: outfit["reason"] for day, outfit in plan.items()}
+            unfilled = [day.title() for day, outfit in plan.items() if not outfit["shirt"]]
+            if unfilled:
+                st.warning(f"Not enough distinct shirts and pants to fill: {', '.join(unfilled)}.")
+            else:
+                st.success("Your week is planned!")
+        except Exception as e:
+            st.error(f"Could not save your week: {e}")
+
+    reasons = st.session_state.get("week_reasons", {})
+    for col, day in zip(st.columns(len(DAYS)), DAYS):
+        outfit = week.get(day, {})
+        col.markdown(f"**{day.title()}**" + (" 🔒" if day in locked_days else ""))
+        for item_id, items in ((outfit.get("shirt"), shirts_data), (outfit.get("pant"), pants_data)):
+            item = items.get(item_id)
+            if item:
+                col.image(item.get("thumb") or item["img"], use_container_width=True)
+        if reasons.get(day):
+            col.caption(reasons[day])
+
 # Safely escape JSON to prevent parser breaking in frontend
-shirts_json = json.dumps(shirts_data).replace("'", "\\'")
-pants_json = json.dumps(pants_data).replace("'", "\\'")
+page_json = json.dumps(page_items).replace("'", "\\'")
+candidates_json = json.dumps(candidate_items).replace("'", "\\'")
+rank_json = json.dumps(local_rank).replace("'", "\\'")
 
 current_day = datetime.datetime.now().strftime('%A').lower()
 
+# Bumped on every add/delete; keys the browser's cached match rankings
+wardrobe_version = int(user_data.get("version", 0))
+
 # Get Gemini API Key Securely for the Frontend
 frontend_gemini_key = st.secrets["gemini"]["api_key"]
 
@@ -89,9 +167,6 @@ carousel_html = f"""
 <meta name="viewport" content="width=device-width, initial-scale=1.0"/>
 <style>
 body {{ background: transparent; font-family: 'Inter', "Segoe UI", sans-serif; color: white; margin: 0; padding: 0; overflow-x: hidden; }}
-.top-bar {{ display: flex; justify-content: center; align-items: center; padding: 20px; }}
-.toggle-btn {{ padding: 12px 24px; background: rgba(255, 255, 255, 0.1); backdrop-filter: blur(10px); border: 1px solid rgba(255,255,255,0.2); color: white; border-radius: 30px; cursor: pointer; font-size: 16px; font-weight: 600; transition: all 0.3s ease; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }}
-.toggle-btn:hover {{ background: rgba(255, 255, 255, 0.2); transform: translateY(-2px); }}
 .carousel-container {{ width: 100%; height: 450px; display: flex; align-items: center; justify-content: center; overflow: hidden; position: relative; }}
 .carousel {{ position: relative; width: 100%; height: 100%; }}
 .empty-state {{ position: absolute; top: 50%; left: 50%; transform: translate(-50%, -50%); color: rgba(255,255,255,0.6); font-size: 1.2rem; text-align: center; width: 80%; }}
@@ -127,10 +202,6 @@ body {{ background: transparent; font-family: 'Inter', "Segoe UI", sans-serif; c
 </head>
 <body>
 
-<div class="top-bar">
-    <button class="toggle-btn" id="toggleCategoryBtn">Switch to Pants Wardrobe</button>
-</div>
-
 <div class="carousel-container" id="carouselContainer">
   <div class="carousel" id="carousel"></div>
 </div>
@@ -144,7 +215,7 @@ body {{ background: transparent; font-family: 'Inter', "Segoe UI", sans-serif; c
 <script type="module">
 // 1. IMPORT FIREBASE WEB SDK
 import {{ initializeApp }} from "https://www.gstatic.com/firebasejs/10.8.1/firebase-app.js";
-import {{ getFirestore, doc, updateDoc, deleteField }} from "https://www.gstatic.com/firebasejs/10.8.1/firebase-firestore.js";
+import {{ getFirestore, doc, updateDoc, deleteField, increment }} from "https://www.gstatic.com/firebasejs/10.8.1/firebase-firestore.js";
 
 // 2. YOUR EXACT CONFIG (Web Configs are safe to be public)
 const firebaseConfig = {{
@@ -166,46 +237,76 @@ const GEMINI_API_KEY = '{frontend_gemini_key}';
 const GEMINI_API_URL = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent';
 
 // SAFER JSON PARSING (Fixes rendering issues in deployed apps)
-let shirts_data = JSON.parse('{shirts_json}');
-let pants_data = JSON.parse('{pants_json}');
+// Only the current page of this category, plus the shortlisted counterparts of those items, is sent.
+let page_items = JSON.parse('{page_json}');
+let candidate_items = JSON.parse('{candidates_json}');
+const local_rank = JSON.parse('{rank_json}');
+const LLM_TIMEOUT_MS = {config.MATCH_LLM_TIMEOUT_MS};
+const LOCAL_RETRY_MS = {config.MATCH_LOCAL_RETRY_S * 1000};
+const CAROUSEL_WINDOW = {config.CAROUSEL_WINDOW};
 const current_day = "{current_day}";
 const TARGET_DOC_ID = "{user_doc_id}";
+let wardrobe_version = {wardrobe_version};
 
-let currentCategory = "shirts";
+const currentCategory = "{side}";
+const itemType = currentCategory === "shirts" ? "Shirt" : "Pant";
+let itemIds = Object.keys(page_items);
 let currentIndex = 0;
 let selectedItem = null; 
 let matchHistory = []; 
 
-function buildCards(data, type) {{
+// --- Virtualized carousel: only cards within CAROUSEL_WINDOW of the focused one exist in the DOM ---
+const mountedCards = new Map();
+
+function createCard(id) {{
+    const item = page_items[id];
+    const card = document.createElement("div");
+    card.className = "card";
+    card.innerHTML = `
+        <div class="card-img-container"><img src="${{item.thumb}}" alt="${{itemType}}" loading="lazy" decoding="async" onerror="this.src='https://via.placeholder.com/250x250?text=Image+Not+Found'"/></div>
+        <div class="card-details">
+            <div class="card-actions">
+                <div class="color-swatch" style="background-color: ${{item.hex}};"></div>
+                <button class="select-btn" data-id="${{id}}">Select</button>
+            </div>
+        </div>
+    `;
+    return card;
+}}
+
+function resetCarousel() {{
     const carousel = document.getElementById("carousel");
     carousel.innerHTML = "";
-    const entries = Object.entries(data);
-    if (entries.length === 0) {{
-        carousel.innerHTML = `<div class="empty-state">No ${{type.toLowerCase()}}s added yet.<br>Head to Dress++ to upload some!</div>`;
-        return;
+    mountedCards.clear();
+    itemIds = Object.keys(page_items);
+    if (itemIds.length === 0) {{
+        carousel.innerHTML = `<div class="empty-state">No ${{itemType.toLowerCase()}}s added yet.<br>Head to Dress++ to upload some!</div>`;
     }}
-    entries.forEach(([id, item], idx) => {{
-        const card = document.createElement("div");
-        card.className = "card";
-        card.dataset.index = idx;
-        card.innerHTML = `
-            <div class="card-img-container"><img src="${{item.img}}" alt="${{type}}" onerror="this.src='https://via.placeholder.com/250x250?text=Image+Not+Found'"/></div>
-            <div class="card-details">
-                <div class="card-actions">
-                    <div class="color-swatch" style="background-color: ${{item.hex}};"></div>
-                    <button class="select-btn" data-id="${{id}}">Select</button>
-                </div>
-            </div>
-        `;
-        carousel.appendChild(card);
-    }});
 }}
 
 function updateCarousel() {{
-    const cards = Array.from(document.getElementsByClassName("card"));
-    if(cards.length === 0) return;
+    if (itemIds.length === 0) return;
+    const carousel = document.getElementById("carousel");
+    const first = Math.max(0, currentIndex - CAROUSEL_WINDOW);
+    const last = Math.min(itemIds.length - 1, currentIndex + CAROUSEL_WINDOW);
+
+    // Unmount cards that scrolled out of the window, mount the ones that scrolled in
+    for (const [index, card] of mountedCards) {{
+        if (index < first || index > last) {{
+            card.remove();
+            mountedCards.delete(index);
+        }}
+    }}
+    for (let index = first; index <= last; index++) {{
+        if (!mountedCards.has(index)) {{
+            const card = createCard(itemIds[index]);
+            carousel.appendChild(card);
+            mountedCards.set(index, card);
+        }}
+    }}
+
     const spacing = window.innerWidth < 600 ? 180 : 240;
-    cards.forEach((card, index) => {{
+    mountedCards.forEach((card, index) => {{
         const offset = index - currentIndex;
         let scale = offset === 0 ? 1.1 : 0.85;
         card.style.transform = `translate(calc(-50% + ${{offset * spacing}}px), -50%) scale(${{scale}})`;
@@ -225,8 +326,7 @@ function updateCarousel() {{
 
 document.getElementById("carouselContainer").addEventListener("wheel", e => {{
     e.preventDefault();
-    const cards = document.getElementsByClassName("card");
-    if (e.deltaY > 0 && currentIndex < cards.length - 1) currentIndex++;
+    if (e.deltaY > 0 && currentIndex < itemIds.length - 1) currentIndex++;
     else if (e.deltaY < 0 && currentIndex > 0) currentIndex--;
     updateCarousel();
 }}, {{ passive: false }});
@@ -235,9 +335,8 @@ let touchStartX = 0;
 document.getElementById("carouselContainer").addEventListener("touchstart", e => touchStartX = e.touches[0].clientX);
 document.getElementById("carouselContainer").addEventListener("touchend", e => {{
     const delta = e.changedTouches[0].clientX - touchStartX;
-    const cards = document.getElementsByClassName("card");
     if (Math.abs(delta) > 40) {{
-        if (delta < 0 && currentIndex < cards.length - 1) currentIndex++;
+        if (delta < 0 && currentIndex < itemIds.length - 1) currentIndex++;
         else if (delta > 0 && currentIndex > 0) currentIndex--;
         updateCarousel();
     }}
@@ -246,40 +345,72 @@ document.getElementById("carouselContainer").addEventListener("touchend", e => {
 document.addEventListener("click", e => {{
     if (e.target.classList.contains("select-btn")) {{
         const id = e.target.dataset.id;
-        const dataMap = currentCategory === "shirts" ? shirts_data : pants_data;
-        selectedItem = {{ id: id, type: currentCategory === "shirts" ? "Shirt" : "Pant", ...dataMap[id] }};
-        updateCarousel();
-    }}
-
-    if (e.target.id === "toggleCategoryBtn") {{
-        currentCategory = currentCategory === "shirts" ? "pants" : "shirts";
-        e.target.textContent = currentCategory === "shirts" ? "Switch to Pants Wardrobe" : "Switch to Shirts Wardrobe";
-        currentIndex = 0;
-        selectedItem = null;
-        matchHistory = [];
-        document.getElementById("aiResult").style.display = "none";
-        buildCards(currentCategory === "shirts" ? shirts_data : pants_data, currentCategory === "shirts" ? "Shirt" : "Pant");
+        selectedItem = {{ id: id, type: itemType, ...page_items[id] }};
         updateCarousel();
     }}
 }});
 
-async function fetchMatch(excludeIds=[]) {{
-    let opposite_dict = selectedItem.type === "Shirt" ? pants_data : shirts_data;
+// Server-ranked [id, score, reason] candidates for the selected item that are still available
+function localCandidates(opposite_dict, excludeIds) {{
+    const side = selectedItem.type === "Shirt" ? "shirts" : "pants";
+    return (local_rank[side][selectedItem.id] || []).filter(([id]) => !excludeIds.includes(id) && opposite_dict[id]);
+}}
+
+// --- Ranked match cache: one AI request per (selected item, wardrobe version) ---
+// Alternates are served from the cached ranking; any add/delete bumps the version and invalidates it.
+// A local fallback ranking is cached too, so a slow or failing AI is retried after LOCAL_RETRY_MS, not on every click.
+const MATCH_CACHE_KEY = "fashn8_matches_" + TARGET_DOC_ID;
+let matchCache = loadMatchCache();
+
+function loadMatchCache() {{
+    try {{
+        const stored = JSON.parse(localStorage.getItem(MATCH_CACHE_KEY) || "null");
+        if (stored && stored.version === wardrobe_version) return stored.entries;
+    }} catch(err) {{}}
+    return {{}};
+}}
+
+function saveMatchCache() {{
+    try {{
+        localStorage.setItem(MATCH_CACHE_KEY, JSON.stringify({{ version: wardrobe_version, entries: matchCache }}));
+    }} catch(err) {{}}
+}}
+
+function invalidateMatchCache() {{
+    wardrobe_version += 1;
+    matchCache = {{}};
+    saveMatchCache();
+}}
+
+async function getRankedMatches() {{
+    const cacheKey = `${{selectedItem.type}}:${{selectedItem.id}}`;
+    const cached = matchCache[cacheKey];
+    if (cached && (cached.retryAt == null || Date.now() < cached.retryAt)) return cached;
+
+    let opposite_dict = candidate_items;
     let opposite_type = selectedItem.type === "Shirt" ? "Pant" : "Shirt";
-    
-    let available_options = [];
-    Object.entries(opposite_dict).forEach(([id, item]) => {{
-        if(!excludeIds.includes(id)) available_options.push({{id: id, desc: item.desc, hex: item.hex}});
-    }});
 
-    if(available_options.length === 0) return {{ error: "No more items left to match." }};
+    const shortlist = localCandidates(opposite_dict, []);
+    // The local ranking doubles as the fallback when the AI is slow or unavailable
+    const localRanked = {{ ranked: shortlist.map(([id, score, reason]) => [id, reason]), source: "local" }};
+    const cacheLocal = (retry) => {{
+        matchCache[cacheKey] = {{ ...localRanked, retryAt: retry ? Date.now() + LOCAL_RETRY_MS : null }};
+        saveMatchCache();
+        return matchCache[cacheKey];
+    }};
+    // Nothing for the AI to rank: the local answer is final for this wardrobe version
+    if (shortlist.length <= 1) return cacheLocal(false);
+
+    let available_options = shortlist.map(([id]) => ({{id: id, desc: opposite_dict[id].desc, hex: opposite_dict[id].hex}}));
 
     const prompt = `
         You are an expert fashion stylist. My current item: A ${{selectedItem.type}} described as "${{selectedItem.desc}}" with color hex ${{selectedItem.hex}}.
-        Available ${{opposite_type}} options: ${{JSON.stringify(available_options)}}
-        Select the BEST match. Return ONLY a JSON object: {{"best_match_id": "string", "reason": "string"}}.
+        Shortlisted ${{opposite_type}} options (pre-ranked by color harmony, best first): ${{JSON.stringify(available_options)}}
+        Rank ALL options from best to worst match. Return ONLY a JSON object: {{"ranking": [{{"id": "string", "reason": "string"}}]}}.
     `;
 
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), LLM_TIMEOUT_MS);
     try {{
         const response = await fetch(GEMINI_API_URL + '?key=' + GEMINI_API_KEY, {{
             method: 'POST',
@@ -287,24 +418,52 @@ async function fetchMatch(excludeIds=[]) {{
             body: JSON.stringify({{
                 contents: [{{ role: "user", parts: [{{ text: prompt }}] }}],
                 generationConfig: {{ responseMimeType: "application/json" }}
-            }})
+            }}),
+            signal: controller.signal
         }});
         const data = await response.json();
         const parsed = JSON.parse(data.candidates[0].content.parts[0].text);
-        return {{ success: true, match_id: parsed.best_match_id, reason: parsed.reason, opposite_dict }};
+
+        const allowed = new Set(shortlist.map(([id]) => id));
+        const seen = new Set();
+        const ranked = [];
+        (parsed.ranking || []).forEach(entry => {{
+            if (allowed.has(entry.id) && !seen.has(entry.id)) {{
+                seen.add(entry.id);
+                ranked.push([entry.id, entry.reason]);
+            }}
+        }});
+        if (ranked.length === 0) return cacheLocal(true);
+        // Anything the model skipped keeps its local order at the end
+        shortlist.forEach(([id, score, reason]) => {{ if (!seen.has(id)) ranked.push([id, reason]); }});
+
+        matchCache[cacheKey] = {{ ranked, source: "ai", retryAt: null }};
+        saveMatchCache();
+        return matchCache[cacheKey];
     }} catch(err) {{
-        return {{ error: "AI response failed." }};
+        return cacheLocal(true);
+    }} finally {{
+        clearTimeout(timer);
     }}
 }}
 
-function renderMatch(match_id, reason, opposite_dict) {{
+async function fetchMatch(excludeIds=[]) {{
+    let opposite_dict = candidate_items;
+    const {{ ranked, source }} = await getRankedMatches();
+    const next = ranked.find(([id]) => !excludeIds.includes(id) && opposite_dict[id]);
+    if (!next) return {{ error: "No more items left to match." }};
+    return {{ success: true, match_id: next[0], reason: next[1], opposite_dict, source }};
+}}
+
+function renderMatch(match_id, reason, opposite_dict, source="ai") {{
     const itemInfo = opposite_dict[match_id];
     const resultDiv = document.getElementById("aiResult");
+    const heading = source === "local" ? "🎨 Color-Harmony Match (AI stylist unavailable)" : "✨ Curated Match Found!";
     resultDiv.style.display = "block";
     resultDiv.innerHTML = `
-        <div style="margin-bottom: 10px; font-weight:bold; color: #4CAF50;">✨ Curated Match Found!</div>
+        <div style="margin-bottom: 10px; font-weight:bold; color: #4CAF50;">${{heading}}</div>
         <div class="match-display">
-            <img src="${{itemInfo.img}}" class="match-img" onerror="this.src='https://via.placeholder.com/120x120?text=No+Img'">
+            <img src="${{itemInfo.thumb || itemInfo.img}}" class="match-img" onerror="this.src='https://via.placeholder.com/120x120?text=No+Img'">
             <div class="match-info">
                 <div style="display: flex; align-items: center; gap: 8px; margin-bottom: 8px;">
                     <span style="font-size: 14px; color: #ccc;">Match Color:</span>
@@ -335,7 +494,7 @@ document.getElementById("aiMatchBtn").addEventListener("click", async (e) => {{
     const result = await fetchMatch();
     if (result.success) {{
         matchHistory.push(result.match_id);
-        renderMatch(result.match_id, result.reason, result.opposite_dict);
+        renderMatch(result.match_id, result.reason, result.opposite_dict, result.source);
     }} else {{
         resultDiv.innerHTML = `<div style='color: #ff5252;'>${{result.error}}</div>`;
     }}
@@ -371,23 +530,25 @@ document.getElementById("deleteItemBtn").addEventListener("click", async (e) =>
         // Construct map deletion path using Firestore deleteField()
         const updateData = {{}};
         updateData[`${{dbCategory}}.${{selectedItem.id}}`] = deleteField();
+        // Drop the item's perceptual hash so Dress++ stops flagging re-uploads of it
+        updateData[`hashes.${{dbCategory}}_${{selectedItem.id}}`] = deleteField();
+        // Bump the wardrobe version so cached match rankings are invalidated everywhere
+        updateData["version"] = increment(1);
         
         // Execute Database Update
         await updateDoc(userRef, updateData);
 
+        invalidateMatchCache();
+
         // Remove item from local dictionaries so UI updates without page reload
-        if (currentCategory === "shirts") {{
-            delete shirts_data[selectedItem.id];
-        }} else {{
-            delete pants_data[selectedItem.id];
-        }}
+        delete page_items[selectedItem.id];
 
         // Reset state and redraw UI
         selectedItem = null;
         currentIndex = 0;
         matchHistory = [];
         resultDiv.style.display = "none";
-        buildCards(currentCategory === "shirts" ? shirts_data : pants_data, currentCategory === "shirts" ? "Shirt" : "Pant");
+        resetCarousel();
         updateCarousel();
 
         alert("Item successfully deleted from your wardrobe!");
@@ -409,7 +570,7 @@ document.addEventListener("click", async e => {{
         const result = await fetchMatch(matchHistory);
         if (result.success) {{
             matchHistory.push(result.match_id);
-            renderMatch(result.match_id, result.reason, result.opposite_dict);
+            renderMatch(result.match_id, result.reason, result.opposite_dict, result.source);
         }} else {{
             const errDiv = document.createElement("div");
             errDiv.style.color = "#ff5252"; errDiv.innerText = result.error;
@@ -457,7 +618,7 @@ document.addEventListener("click", async e => {{
 }});
 
 // Initialize
-buildCards(shirts_data, "Shirt");
+resetCarousel();
 updateCarousel();
 window.addEventListener("resize", updateCarousel);
 </script>
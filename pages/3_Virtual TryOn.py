@@ -1,13 +1,16 @@
 import streamlit as st
-from gradio_client import Client, handle_file
-import tempfile
+import firebase_admin
+from firebase_admin import credentials, firestore
 import asyncio
-from PIL import Image
-import numpy as np
-from collections import Counter
-import colorsys
-import random
-import os
+import io
+
+from core.cache import content_key
+from core.colormodel import get_color_model
+from core.colors import dominant_rgb
+from core.harmony import hex_to_rgb
+from core.repository import get_repository
+from core.scratch import session_scratch
+from core.tryon import DONE, FAILED, get_tryon_queue, prepare_person
 
 # --- Prevent Gradio Asyncio Thread Crashes on Cloud ---
 try:
@@ -58,61 +61,34 @@ if st.session_state.get('authentication_status'):
         st.session_state['show_signup_form'] = False
         st.rerun()
 
+# Wardrobe items are optional here; try-ons from uploads still work without Firebase
+try:
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(dict(st.secrets["firebase"]))
+        firebase_admin.initialize_app(cred)
+    wardrobe_repo = get_repository(st.session_state, firestore.client(), st.session_state['username'])
+except Exception:
+    wardrobe_repo = None
+
 # --------------------------------------------------------------------------
 # HELPER FUNCTIONS
 # --------------------------------------------------------------------------
-def save_uploaded_file(uploaded_file):
-    if uploaded_file is None:
-        return None
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix="." + uploaded_file.name.split('.')[-1])
-    tmp.write(uploaded_file.read())
-    tmp.close()
-    return tmp.name
-
 def get_dominant_color(image_path):
     """Extract dominant color from an image."""
     try:
-        img = Image.open(image_path).convert('RGB')
-        img = img.resize((150, 150))  # Resize for faster processing
-        pixels = np.array(img)
-        pixels_reshaped = pixels.reshape(-1, 3)
-        
-        # Get most common color
-        rgb = pixels_reshaped[np.random.choice(pixels_reshaped.shape[0], 5000, replace=True)]
-        most_common = Counter(map(tuple, rgb)).most_common(1)[0][0]
-        
-        return most_common
-    except:
+        rgb = dominant_rgb(image_path, max_side=256)
+        return rgb if rgb is not None else (128, 128, 128)
+    except Exception:
         return (128, 128, 128)  # Default gray if error
 
-def rgb_to_hsl(rgb):
-    """Convert RGB to HSL."""
-    r, g, b = [x / 255.0 for x in rgb]
-    h, l, s = colorsys.rgb_to_hls(r, g, b)
-    return h, s, l
+def calculate_compatibility_ratings(rgb_pairs):
+    """Ratings (1.0 - 5.0) for a list of (rgb1, rgb2) color pairs, scored in one call.
 
-def calculate_compatibility_rating(rgb1, rgb2):
-    """Calculate compatibility rating between two colors (1.0 - 5.0)."""
-    h1, s1, l1 = rgb_to_hsl(rgb1)
-    h2, s2, l2 = rgb_to_hsl(rgb2)
-    
-    # Calculate differences
-    h_diff = abs(h1 - h2)
-    h_diff = h_diff if h_diff <= 0.5 else 1.0 - h_diff
-    l_diff = abs(l1 - l2)
-    s_diff = abs(s1 - s2)
-    
-    # Simple scoring: complementary colors and good contrast = higher rating
-    score = 5.0
-    score -= h_diff * 2  # Hue difference penalty
-    score -= l_diff * 0.5  # Lightness difference (small penalty)
-    score += min(l_diff, s_diff) * 0.5  # Bonus for some contrast
-    
-    # Add some randomness for realism (±0.3)
-    score += random.uniform(-0.5, 0.5)
-    
-    # Clamp between 1.0 and 5.0
-    return round(max(1.0, min(5.0, score)), 1)
+    The model is a fast stand-in for the core.harmony color rules, not a learned taste model.
+    """
+    model = get_color_model()
+    scores = model.predict_rgb([a for a, _ in rgb_pairs], [b for _, b in rgb_pairs])
+    return [float(r) for r in model.to_rating(scores)]
 
 # --------------------------------------------------------------------------
 # UI LAYOUT
@@ -121,7 +97,9 @@ col1, col2 = st.columns(2)
 with col1:
     base_img = st.file_uploader("Upload Your Image", type=["png", "jpg", "jpeg", "webp"])
 with col2:
-    garment_img = st.file_uploader("Upload Garment/Product Image", type=["png", "jpg", "jpeg", "webp"])
+    garment_imgs = st.file_uploader(
+        "Upload Garment/Product Images", type=["png", "jpg", "jpeg", "webp"], accept_multiple_files=True
+    )
 
 # Dropdown with logic to match the API's specific keywords
 garment_type = st.selectbox(
@@ -137,81 +115,152 @@ category_map = {
 }
 category = category_map[garment_type]
 
+# Saved wardrobe items can be tried on too; their category follows the Firestore map
+wardrobe_categories = {"shirts": ("Shirt", "tops"), "pant": ("Pant", "bottoms")}
+wardrobe_options = {}
+if wardrobe_repo is not None:
+    user_data = wardrobe_repo.data()
+    for collection, (kind, _) in wardrobe_categories.items():
+        for item_id, item in user_data.get(collection, {}).items():
+            if item.get("img"):
+                wardrobe_options[f"{kind} #{item_id} – {item.get('desc', '')[:40]}"] = (collection, item)
+picked = st.multiselect("Or pick items from your wardrobe", list(wardrobe_options))
+
 # --------------------------------------------------------------------------
 # GENERATION LOGIC
 # --------------------------------------------------------------------------
-if st.button("Generate", use_container_width=True):
-    if base_img is None or garment_img is None:
-        st.error("Please upload both your image and garment image.")
+# Jobs run on a shared background queue (bounded fan-out); the session only keeps their ids.
+try:
+    tryon_queue = get_tryon_queue(st.secrets["huggingface"]["token"])
+except Exception as e:
+    st.error(f"🤗 Hugging Face Error: Failed to set up the try-on client. Check your Streamlit Cloud secrets. Error details: {e}")
+    st.stop()
+job_ids = st.session_state.setdefault("tryon_jobs", [])
+ratings = st.session_state.setdefault("tryon_ratings", {})
+garment_colors = st.session_state.setdefault("tryon_garment_colors", {})
+
+def prepared_person(uploaded):
+    # Normalize the selfie once per session; the queue then uploads it to the Space only once
+    raw = uploaded.getvalue()
+    key = content_key(raw)
+    cached = st.session_state.get("tryon_person")
+    if cached is None or cached[0] != key:
+        cached = st.session_state["tryon_person"] = (key, prepare_person(raw))
+    return cached[1]
+
+# (garment bytes or hosted URL, category, label, dominant rgb) for everything selected
+garments = [(f.getvalue(), category, f.name, None) for f in garment_imgs or []]
+for choice in picked:
+    collection, item = wardrobe_options[choice]
+    garments.append((item["img"], wardrobe_categories[collection][1], choice, tuple(hex_to_rgb([item.get("hex")])[0] * 255)))
+
+generate_label = f"Generate {len(garments)} try-ons" if len(garments) > 1 else "Generate"
+if st.button(generate_label, use_container_width=True):
+    if base_img is None or not garments:
+        st.error("Please upload your image and at least one garment.")
     else:
-        with st.spinner("Generating virtual try-on..."):
-            try:
-                # 1. INITIALIZE CLIENT securely using st.secrets
-                os.environ["HF_TOKEN"] = st.secrets["huggingface"]["token"]
-                client = Client("fashn-ai/fashn-vton-1.5")
-
-                # 2. PREPARE FILES
-                base_img_path = save_uploaded_file(base_img)
-                garment_img_path = save_uploaded_file(garment_img)
-
-                # 3. PREPARE HANDLES
-                person_image = handle_file(base_img_path)
-                garment_image = handle_file(garment_img_path)
-
-                # 4. CALL API with /try_on endpoint
-                result = client.predict(
-                    person_image=person_image,
-                    garment_image=garment_image,
-                    category=category,
-                    garment_photo_type="model",
-                    api_name="/try_on"
-                )
-
-                # 5. HANDLE RESULT
-                if result:
-                    # Extract output path from result
-                    output_path = result
-                    
-                    if isinstance(result, (list, tuple)) and len(result) > 0:
-                        output_path = result[0]
-                    
-                    if isinstance(output_path, dict) and 'path' in output_path:
-                        output_path = output_path['path']
-
-                    st.image(output_path, caption="Virtual Try-On Result", width=250)
-                    st.success("✨ Try-on generated successfully!")
-                    
-                    # Auto-Rate the Try-On
-                    st.markdown("---")
-                    
-                    # Extract colors and calculate rating
-                    person_color = get_dominant_color(base_img_path)
-                    garment_color = get_dominant_color(garment_img_path)
-                    rating = calculate_compatibility_rating(person_color, garment_color)
-                    
-                    # Display rating with stars
-                    stars = "⭐" * int(rating) + ("✨" if rating % 1 >= 0.5 else "")
-                    st.markdown(f"### AI Rating: {rating}/5.0 {stars}")
-                    st.write(f"This outfit combination has a **{rating}/5.0** style compatibility score!")
-                else:
-                    st.error("API returned empty result.")
-            
-            except Exception as e:
-                error_msg = str(e)
-                
-                # Handle GPU quota exceeded error
-                if "GPU quota" in error_msg or "exceeded" in error_msg:
-                    st.warning("⏳ **GPU Quota Temporarily Exceeded**")
-                    st.info("""
-                    The AI model is currently at capacity. This is a free service limitation.
-                    
-                    **Options:**
-                    1. **Wait and retry** - The quota usually resets in 15-30 minutes
-                    2. **Try again later** - Peak hours may have more wait time
-                    3. **Use simpler clothing** - Smaller images process faster
-                    
-                    Please try again in a few minutes! ✨
-                    """)
-                else:
-                    st.error(f"❌ API Error: {error_msg}")
-                    st.info("Please check your internet connection and try again.")
+        person_bytes = prepared_person(base_img)
+        in_progress = {job.key for job in (tryon_queue.get(job_id) for job_id in job_ids) if job and job.active}
+        skipped = 0
+        for garment, garment_category, label, rgb in garments:
+            if content_key(person_bytes, garment, garment_category, "model") in in_progress:
+                skipped += 1
+                continue
+            job = tryon_queue.submit(
+                person_bytes, garment, garment_category, "model", label=label, scratch=session_scratch(st.session_state)
+            )
+            job_ids.append(job.id)
+            garment_colors[job.id] = rgb or get_dominant_color(io.BytesIO(garment))
+        if skipped:
+            st.info(f"{skipped} of these try-ons are already in progress.")
+
+def show_quota_help():
+    st.warning("⏳ **GPU Quota Temporarily Exceeded**")
+    st.info("""
+    The AI model is currently at capacity. This is a free service limitation.
+    
+    **Options:**
+    1. **Wait and retry** - The quota usually resets in 15-30 minutes
+    2. **Try again later** - Peak hours may have more wait time
+    3. **Use simpler clothing** - Smaller images process faster
+    
+    Please try again in a few minutes! ✨
+    """)
+
+def show_job(job):
+    with st.container(border=True):
+        st.markdown(f"**{job.label or 'Garment'}**")
+        st.caption(f"{job.category} · {job.message}")
+
+        if job.active:
+            if st.button("Cancel", key=f"cancel_{job.id}", use_container_width=True):
+                job.cancel()
+                st.rerun()
+            return
+
+        if job.status == DONE:
+            st.image(job.result, caption="Virtual Try-On Result", use_container_width=True)
+
+            # Auto-Rate the Try-On (scored for the whole batch in show_jobs)
+            rating = ratings[job.id]
+
+            # Display rating with stars
+            stars = "⭐" * int(rating) + ("✨" if rating % 1 >= 0.5 else "")
+            st.markdown(f"**Color Harmony: {rating}/5.0** {stars}")
+            st.caption("Rule-based color-theory score of the photo's and garment's dominant colors")
+        elif job.status == FAILED:
+            # Handle GPU quota exceeded error
+            if "GPU quota" in job.error or "exceeded" in job.error:
+                show_quota_help()
+            else:
+                st.error(f"❌ API Error: {job.error}")
+                st.info("Please check your internet connection and try again.")
+
+        if st.button("Remove", key=f"remove_{job.id}", use_container_width=True):
+            job_ids.remove(job.id)
+            st.rerun()
+
+jobs = [job for job in (tryon_queue.get(job_id) for job_id in job_ids) if job is not None]
+polling = any(job.active for job in jobs)
+
+# Polls only while something is queued or running; a full rerun stops it once everything has finished.
+@st.fragment(run_every=2 if polling else None)
+def show_jobs():
+    current = [job for job in (tryon_queue.get(job_id) for job_id in job_ids) if job is not None]
+    if polling and not any(job.active for job in current):
+        st.rerun()
+    active = [job for job in current if job.active]
+    if len(active) > 1 and st.button(f"Cancel all {len(active)} pending try-ons"):
+        for job in active:
+            job.cancel()
+        st.rerun()
+    # Rate every newly finished result in one batched model call
+    unrated = [job for job in current if job.status == DONE and job.id not in ratings]
+    if unrated:
+        pairs = [
+            (get_dominant_color(io.BytesIO(job.person)),
+             garment_colors.get(job.id) or get_dominant_color(io.BytesIO(job.garment)))
+            for job in unrated
+        ]
+        ratings.update(zip((job.id for job in unrated), calculate_compatibility_ratings(pairs)))
+
+    # Gallery: results appear in their cells as each job finishes, newest first
+    columns = st.columns(3)
+    for n, job in enumerate(reversed(current)):
+        with columns[n % 3]:
+            show_job(job)
+
+if jobs:
+    st.markdown("---")
+    st.subheader("Your try-ons")
+    show_jobs()
+
+# Result cache effectiveness for this server process
+cache_stats = tryon_queue.stats()
+if cache_stats["hits"] or cache_stats["misses"]:
+    with st.sidebar.expander("Try-on cache"):
+        st.write(f"Hits: {cache_stats['hits']}")
+        st.write(f"Misses: {cache_stats['misses']}")
+        st.write(f"Hit rate: {cache_stats['hit_rate']:.0%}")
+        uploads = tryon_queue.upload_stats
+        st.write(f"Person photo uploads: {uploads['uploaded']} (reused {uploads['reused']}×)")
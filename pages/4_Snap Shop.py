@@ -10,18 +10,24 @@ import streamlit as st
 st.set_page_config(page_title="Snap Shop", page_icon="🛍", layout="wide")
 
 # Now import the rest safely
-from gradio_client import Client, handle_file
-import tempfile
 import re
-import io
-import json
 import urllib.parse
-from PIL import Image
-from rembg import remove
 import firebase_admin
 from firebase_admin import credentials, firestore
 import google.generativeai as genai
-from clarifai.client.model import Model
+from core import config
+from core.captioning import caption_image
+from core.descriptors import describe, get_descriptor_index
+from core.detection import get_detector
+from core.pipeline import (
+    cached_caption,
+    cached_detect_regions,
+    cached_dominant_color,
+    cached_remove_background,
+)
+from core.preprocess import apply_matte, box_to_pixels, prepare_image
+from core.repository import get_repository
+from core.search_query import get_query_refiner
 
 # --- UI Styling ---
 bg_url = "https://logincdn.msftauth.net/shared/5/images/fluent_web_dark_2_bf5f23287bc9f60c9be2.svg"
@@ -61,7 +67,6 @@ except Exception as e:
 try:
     GEMINI_API_KEY = st.secrets["gemini"]["api_key"]
     genai.configure(api_key=GEMINI_API_KEY)
-    json_model = genai.GenerativeModel('gemini-2.5-flash', generation_config={"response_mime_type": "application/json"})
     text_model = genai.GenerativeModel('gemini-2.5-flash')
 except Exception as e:
     st.error(f"✨ Gemini Error: Failed to configure AI. Check your Streamlit Cloud secrets. Error details: {e}")
@@ -82,27 +87,21 @@ if st.sidebar.button("Logout", use_container_width=True):
     st.rerun()
 
 # ----------- Fetch Wardrobe Data -----------
-users_ref = db.collection('users')
-query = users_ref.where('username', '==', st.session_state['username']).limit(1)
-user_docs = query.get()
-
-shirts_data = {}
-pants_data = {}
-
-if user_docs:
-    user_data = user_docs[0].to_dict()
-    shirts_data = user_data.get("shirts", {})
-    pants_data = user_data.get("pant", {})
+# Session-wide listener-backed copy of the user document; reruns don't query Firestore
+wardrobe_repo = get_repository(st.session_state, db, st.session_state['username'])
+st.sidebar.caption(f"⚡ {wardrobe_repo.reads_saved} Firestore reads saved this session")
 
 # ----------- Helper Functions -----------
-def save_temp(image, ext="png"):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{ext}") as tmp:
-        image.save(tmp, format=ext.upper())
-        return tmp.name
-
 def remove_background_locally(image_bytes):
-    output_bytes = remove(image_bytes)
-    return Image.open(io.BytesIO(output_bytes)).convert("RGBA")
+    return cached_remove_background(image_bytes)
+
+def detect_apparel(image_bytes):
+    # Shared, process-wide client: the gRPC channel is reused across reruns and sessions
+    return get_detector(st.secrets["clarifai"]["pat"]).detect(image_bytes)
+
+def generate_caption(image):
+    # Pooled Gradio client; the crop is uploaded from memory, not via a temp file
+    return caption_image(image)
 
 def multi_store_buttons(query):
     encoded_query = urllib.parse.quote_plus(query)
@@ -122,40 +121,40 @@ def refine_caption_with_gemini(raw_caption):
     Focus only on clothing type, color, material, and style.
     Return ONLY the raw string query, nothing else.
     """
-    try:
-        response = text_model.generate_content(prompt)
-        return response.text.strip()
-    except Exception as e:
-        return raw_caption
-
-def find_similar_in_wardrobe(target_desc, target_category, shirts_db, pants_db):
-    wardrobe = []
-    
-    if target_category == "Shirt":
-        for k, v in shirts_db.items():
-            wardrobe.append({"id": k, "hex": v.get("hex", "#ffffff"), "img": v.get("img", "")})
-    else:
-        for k, v in pants_db.items():
-            wardrobe.append({"id": k, "hex": v.get("hex", "#ffffff"), "img": v.get("img", "")})
-            
-    if not wardrobe:
-        return []
-        
-    simplified_wardrobe = [{"id": item["id"], "hex": item["hex"]} for item in wardrobe]
-    
-    prompt = f"""
-    I am looking for clothes similar in color to this description: "{target_desc}".
-    Here is my available {target_category} wardrobe with hex color codes: {json.dumps(simplified_wardrobe)}
-    
-    Find up to 4 items in this list that are the closest color match to the description. Evaluate the hex codes visually.
-    Return ONLY a valid JSON list of strings representing the "id"s of the matching items. Example: ["1", "3"]
-    """
-    try:
-        response = json_model.generate_content(prompt)
-        matched_ids = json.loads(response.text)
-        return [item for item in wardrobe if item["id"] in matched_ids]
-    except Exception as e:
-        return []
+    response = text_model.generate_content(prompt)
+    return response.text.strip()
+
+def refine_caption(raw_caption):
+    # Local keyword extraction first, then answers cached by normalized caption; Gemini only on a miss
+    return get_query_refiner().refine(raw_caption, refine_caption_with_gemini)
+
+def find_similar_in_wardrobe(target_hex, target_vector, target_category):
+    # Everything runs locally; returns up to SIMILAR_TOP_K matches, best first
+    collection = "shirts" if target_category == "Shirt" else "pant"
+    items = wardrobe_repo.items(collection)
+    min_similarity = config.SIMILAR_MIN_SIMILARITY / 100
+    # Cosine top-k over the shared, memory-mapped descriptor matrix (color histogram + texture)
+    visual_index = get_descriptor_index(st.session_state['username'], collection, items)
+    found = [(similarity, item_id, f"Visual match · {similarity:.0%}")
+             for item_id, similarity in visual_index.nearest(target_vector, config.SIMILAR_TOP_K)
+             if similarity >= min_similarity]
+    # Items saved before descriptors existed: CIEDE2000 nearest-color search on their stored hex,
+    # with ΔE mapped onto the same scale (0 -> 100%, the ΔE cut-off -> the similarity cut-off)
+    indexed = set(visual_index.ids)
+    unindexed = [item_id for item_id in items if item_id not in indexed]
+    if unindexed:
+        for item_id, delta_e in wardrobe_repo.color_index(collection).nearest(
+                target_hex, config.SIMILAR_TOP_K, config.SIMILAR_MAX_DELTA_E, only=unindexed):
+            score = 1 - (1 - min_similarity) * delta_e / config.SIMILAR_MAX_DELTA_E
+            found.append((score, item_id, f"Match Color · ΔE {delta_e:.1f}"))
+    found.sort(key=lambda match: -match[0])
+    matches = []
+    # Grids show the small thumbnail; items saved before thumbnails existed fall back to the master
+    for _, item_id, label in found[:config.SIMILAR_TOP_K]:
+        v = items.get(item_id, {})
+        matches.append({"id": item_id, "hex": v.get("hex", "#ffffff"), "img": v.get("img", ""),
+                        "thumb": v.get("thumb") or v.get("img", ""), "label": label})
+    return matches
 
 # ----------- Streamlit UI Flow -----------
 
@@ -164,25 +163,20 @@ with st.container(border=True):
 
 if uploaded_file:
     st.write("") # Spacer
-    original_image = Image.open(uploaded_file).convert("RGB")
+    # Bounded draft-mode decode plus a compact JPEG payload for detection and matting
+    prepared = prepare_image(uploaded_file)
+    original_image = prepared.original
     width, height = original_image.size
-
-    buffer = io.BytesIO()
-    original_image.save(buffer, format="PNG")
-    image_bytes = buffer.getvalue()
+    image_bytes = prepared.payload
 
     with st.spinner("Extracting garment & analyzing style..."):
         try:
             # Background removal
-            bg_removed_image = remove_background_locally(image_bytes)
+            bg_removed_image = apply_matte(original_image, remove_background_locally(image_bytes))
 
             # Clarifai apparel detection
             try:
-                pat = st.secrets["clarifai"]["pat"]
-                apparel_model_url = "https://clarifai.com/clarifai/main/models/apparel-detection"
-                apparel_model = Model(url=apparel_model_url, pat=pat)
-                prediction = apparel_model.predict_by_bytes(image_bytes, input_type="image")
-                regions = prediction.outputs[0].data.regions
+                regions = cached_detect_regions(image_bytes, detect_apparel)
             except Exception as e:
                 st.error(f"Clarifai API Error: Please ensure your 'pat' is correct in secrets. {e}")
                 st.stop()
@@ -199,18 +193,14 @@ if uploaded_file:
             detected_category = None
             
             for region in regions:
-                label = region.data.concepts[0].name.lower()
+                label = region["label"].lower()
                 if label in top_labels:
                     detected_category = "Shirt"
                 elif label in bottom_labels:
                     detected_category = "Pant"
                     
                 if detected_category:
-                    box = region.region_info.bounding_box
-                    left = int(box.left_col * width)
-                    top = int(box.top_row * height)
-                    right = int(box.right_col * width)
-                    bottom = int(box.bottom_row * height)
+                    left, top, right, bottom = box_to_pixels(region["box"], width, height)
                     dress_crop = bg_removed_image.crop((left, top, right, bottom))
                     break
 
@@ -218,19 +208,19 @@ if uploaded_file:
                 st.error("No recognizable clothing item detected in the image.")
                 st.stop()
 
+            # Garment color from the cut-out (transparent background ignored), cached per crop
+            target_hex = cached_dominant_color(dress_crop)
+            target_vector = describe(dress_crop)
+
             # Convert RGBA → RGB before saving
             dress_crop = dress_crop.convert("RGB")
-            temp_path = save_temp(dress_crop, ext="png")
 
-            # Get caption from Gradio Client
-            client = Client("ovi054/image-to-prompt")
-            image_for_client = handle_file(temp_path)
-            caption = client.predict(image=image_for_client, api_name="/predict")
-            os.remove(temp_path)
+            # Get caption from Gradio Client (cached per crop)
+            caption = cached_caption(dress_crop, generate_caption)
 
             # Clean and Refine caption
             caption = re.sub(r'[^a-zA-Z0-9\s]', '', caption).strip()
-            refined_caption = refine_caption_with_gemini(caption)
+            refined_caption = refine_caption(caption)
             
             # --- RENDER RESULTS (Pure Streamlit Layout) ---
             col1, col2 = st.columns([1, 1.8], gap="large")
@@ -258,24 +248,32 @@ if uploaded_file:
             st.write("")
             st.subheader(f"Similar {detected_category}s in Your Wardrobe")
             
-            with st.spinner(f"Scanning your {detected_category.lower()} wardrobe for color matches..."):
-                matches = find_similar_in_wardrobe(refined_caption, detected_category, shirts_data, pants_data)
+            matches = find_similar_in_wardrobe(target_hex, target_vector, detected_category)
             
             if not matches:
-                st.info(f"You don't seem to have any {detected_category.lower()}s matching this color in your wardrobe yet.")
+                st.info(f"You don't seem to have any {detected_category.lower()}s similar to this one in your wardrobe yet.")
             else:
                 # Display matches in a native responsive grid
                 cols = st.columns(4)
                 for index, item in enumerate(matches):
                     with cols[index % 4]:
                         with st.container(border=True):
-                            st.image(item['img'], use_container_width=True)
+                            st.image(item['thumb'], use_container_width=True)
                             
                             col_a, col_b = st.columns([1, 3])
                             with col_a:
                                 st.color_picker("Color", item['hex'], disabled=True, label_visibility="collapsed", key=f"color_{index}")
                             with col_b:
-                                st.caption("Match Color")
+                                st.caption(item['label'])
 
         except Exception as e:
             st.error(f"Error processing image: {str(e)}")
+
+# How often the search query was built without calling Gemini
+query_stats = get_query_refiner().stats()
+if any(query_stats[tier] for tier in ("local", "cached", "remote", "failed")):
+    with st.sidebar.expander("Search query cache"):
+        st.write(f"Local extraction: {query_stats['local']}")
+        st.write(f"Cached: {query_stats['cached']}")
+        st.write(f"Gemini calls: {query_stats['remote']} ({query_stats['failed']} failed)")
+        st.write(f"Hit rate: {query_stats['hit_rate']:.0%}")
@@ -2,9 +2,9 @@ import streamlit as st
 import json
 import requests
 import re
+import io
 import speech_recognition as sr
 from gtts import gTTS
-import os
 
 # --- Configuration & Constants ---
 # SECURITY WARNING: API key hidden via st.secrets to protect your account on GitHub.
@@ -120,10 +120,8 @@ def speech_to_text(audio_file, lang_code):
     """Transcribes audio using Google Speech Recognition, adapted for the selected language."""
     try:
         recognizer = sr.Recognizer()
-        with open("temp_input.wav", "wb") as f:
-            f.write(audio_file.read())
-        
-        with sr.AudioFile("temp_input.wav") as source:
+        # Read the recording from memory; a shared file in the working directory clobbered concurrent sessions
+        with sr.AudioFile(io.BytesIO(audio_file.getvalue())) as source:
             audio_data = recognizer.record(source)
             text = recognizer.recognize_google(audio_data, language=lang_code)
             return text
@@ -139,8 +137,9 @@ def play_voice(text, lang_code):
         clean_text = re.sub(r'<[^>]+>', '', text)
         short_lang = lang_code.split('-')[0] 
         tts = gTTS(text=clean_text, lang=short_lang) 
-        tts.save("temp_out.mp3")
-        st.audio("temp_out.mp3", format="audio/mp3", autoplay=True)
+        buffer = io.BytesIO()
+        tts.write_to_fp(buffer)
+        st.audio(buffer.getvalue(), format="audio/mp3", autoplay=True)
     except Exception as e:
         st.error(f"Voice generation failed: {e}")
 
@@ -0,0 +1,104 @@
+"""One-off backfill: add WebP thumbnails to wardrobe items saved before they existed.
+
+Reads the same `.streamlit/secrets.toml` as the app (firebase + cloudinary
+sections). For every `shirts` / `pant` item without a `thumb`, downloads
+`img`, uploads a thumbnail and writes only the `<map>.<id>.thumb` field.
+With --reencode-master, the master is re-uploaded as WebP as well.
+
+    python -m scripts.backfill_thumbnails --dry-run
+    python -m scripts.backfill_thumbnails --user alice --reencode-master
+"""
+import argparse
+import io
+import os
+
+import cloudinary
+import firebase_admin
+import requests
+import streamlit as st
+from firebase_admin import credentials, firestore
+from PIL import Image
+
+from core.media import encode_master, encode_thumb, upload_webp
+from core.wardrobe import field_path
+
+WARDROBE_MAPS = ("shirts", "pant")
+
+
+def init_services():
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(dict(st.secrets["firebase"]))
+        firebase_admin.initialize_app(cred)
+    cloudinary.config(
+        cloud_name=st.secrets["cloudinary"]["cloud_name"],
+        api_key=st.secrets["cloudinary"]["api_key"],
+        api_secret=st.secrets["cloudinary"]["api_secret"],
+    )
+    return firestore.client()
+
+
+def public_id_for(url):
+    """Cloudinary public id (without folder and extension) from a delivery URL."""
+    return os.path.splitext(url.rstrip("/").rsplit("/", 1)[-1])[0]
+
+
+def backfill_user(user_doc, reencode_master=False, dry_run=False):
+    data = user_doc.to_dict()
+    updates = {}
+    for collection in WARDROBE_MAPS:
+        for item_id, item in (data.get(collection) or {}).items():
+            if item.get("thumb") and not reencode_master:
+                continue
+            if not item.get("img"):
+                continue
+            if dry_run:
+                updates[field_path(collection, item_id, "thumb")] = None
+                continue
+            try:
+                response = requests.get(item["img"], timeout=30)
+                response.raise_for_status()
+                image = Image.open(io.BytesIO(response.content))
+                image.load()
+            except Exception as e:
+                print(f"  skip {collection}/{item_id}: {e}")
+                continue
+
+            public_id = public_id_for(item["img"])
+            if not item.get("thumb"):
+                updates[field_path(collection, item_id, "thumb")] = upload_webp(
+                    encode_thumb(image), f"{public_id}_thumb"
+                )
+            if reencode_master and not item["img"].endswith(".webp"):
+                updates[field_path(collection, item_id, "img")] = upload_webp(
+                    encode_master(image), f"{public_id}_webp"
+                )
+
+    if updates and not dry_run:
+        user_doc.reference.update(updates)
+    return len(updates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user", help="only backfill this username")
+    parser.add_argument("--reencode-master", action="store_true", help="also replace PNG masters with WebP")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without uploading")
+    args = parser.parse_args()
+
+    db = init_services()
+    users = db.collection('users')
+    if args.user:
+        users = users.where('username', '==', args.user)
+
+    total = 0
+    for user_doc in users.stream():
+        changed = backfill_user(user_doc, args.reencode_master, args.dry_run)
+        if changed:
+            print(f"{user_doc.to_dict().get('username', user_doc.id)}: {changed} field(s)"
+                  f"{' would change' if args.dry_run else ' updated'}")
+        total += changed
+    print(f"Done: {total} field(s) {'to update' if args.dry_run else 'updated'}.")
+
+
+if __name__ == "__main__":
+    main()
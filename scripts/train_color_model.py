@@ -0,0 +1,170 @@
+"""Train and evaluate the bundled color-compatibility model (core/colormodel.py).
+
+Training pairs are generated locally. Random garment colors, with extra
+near-neutrals because real wardrobes are full of them, are labeled by the
+core.harmony rule engine. Without `--labels`, the result is therefore a
+distillation of those rules: held-out metrics measure how faithfully it
+reproduces them, not how well it predicts taste. A CSV of human labels
+(`hex_a,hex_b,score` with score in [0, 1]) can be mixed in and weighted up;
+only that moves the model beyond the rules. The model is a small NumPy MLP
+trained with Adam. Metrics are reported on a held-out split.
+
+    python -m scripts.train_color_model
+    python -m scripts.train_color_model --labels ratings.csv --label-weight 5
+    python -m scripts.train_color_model --eval-only
+"""
+import argparse
+import csv
+import time
+
+import numpy as np
+
+from core.colormodel import MODEL_PATH, ColorCompatModel, pair_features
+from core.harmony import hex_to_lab, rgb_to_lab, score_pairs
+
+
+def random_colors(rng, n, neutral_share):
+    """CIELAB for n colors: uniform sRGB plus a share of low-saturation neutrals."""
+    rgb = rng.random((n, 3))
+    neutral = rng.random(n) < neutral_share
+    grey = rng.random((neutral.sum(), 1))
+    rgb[neutral] = np.clip(grey + rng.normal(0, 0.04, (neutral.sum(), 3)), 0, 1)
+    return rgb_to_lab(rgb)
+
+
+def generated_pairs(rng, n_pairs, neutral_share, block=250):
+    """Row-aligned (lab_a, lab_b, score) labeled by the harmony engine, `block` x `block` at a time."""
+    lab_a, lab_b, scores = [], [], []
+    per_block = block * block
+    for _ in range(-(-n_pairs // per_block)):
+        a, b = random_colors(rng, block, neutral_share), random_colors(rng, block, neutral_share)
+        s, _ = score_pairs(a, b)
+        rows, cols = np.divmod(np.arange(per_block), block)
+        lab_a.append(a[rows])
+        lab_b.append(b[cols])
+        scores.append(s.ravel())
+    return np.concatenate(lab_a)[:n_pairs], np.concatenate(lab_b)[:n_pairs], np.concatenate(scores)[:n_pairs]
+
+
+def labeled_pairs(path):
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    return (
+        hex_to_lab([r["hex_a"] for r in rows]),
+        hex_to_lab([r["hex_b"] for r in rows]),
+        np.array([float(r["score"]) for r in rows]),
+    )
+
+
+def init_model(rng, x, hidden):
+    mean, std = x.mean(axis=0), x.std(axis=0) + 1e-8
+    sizes = [x.shape[1], *hidden, 1]
+    weights = [rng.normal(0, 1 / np.sqrt(n_in), (n_in, n_out)) for n_in, n_out in zip(sizes[:-1], sizes[1:])]
+    biases = [np.zeros(n_out) for n_out in sizes[1:]]
+    return ColorCompatModel(mean, std, weights, biases)
+
+
+def train(model, x, y, w, epochs, batch_size, lr, rng):
+    """Weighted-MSE Adam over mini-batches; updates `model` in place."""
+    params = model.weights + model.biases
+    m = [np.zeros_like(p) for p in params]
+    v = [np.zeros_like(p) for p in params]
+    beta1, beta2, step = 0.9, 0.999, 0
+    xs = (x - model.mean) / model.std
+    for epoch in range(epochs):
+        order = rng.permutation(len(xs))
+        total = 0.0
+        for start in range(0, len(xs), batch_size):
+            idx = order[start:start + batch_size]
+            # forward, keeping activations
+            acts = [xs[idx]]
+            for wt, b in zip(model.weights[:-1], model.biases[:-1]):
+                acts.append(np.tanh(acts[-1] @ wt + b))
+            out = 1 / (1 + np.exp(-(acts[-1] @ model.weights[-1] + model.biases[-1])[:, 0]))
+            err = (out - y[idx]) * w[idx]
+            total += float((err * (out - y[idx])).sum())
+
+            # backward
+            grad = (2 * err * out * (1 - out))[:, None] / len(idx)
+            grads_w, grads_b = [], []
+            for layer in range(len(model.weights) - 1, -1, -1):
+                grads_w.append(acts[layer].T @ grad)
+                grads_b.append(grad.sum(axis=0))
+                if layer:
+                    grad = (grad @ model.weights[layer].T) * (1 - acts[layer] ** 2)
+            grads = grads_w[::-1] + grads_b[::-1]
+
+            step += 1
+            for p, g, m_p, v_p in zip(params, grads, m, v):
+                m_p *= beta1
+                m_p += (1 - beta1) * g
+                v_p *= beta2
+                v_p += (1 - beta2) * g * g
+                p -= lr * (m_p / (1 - beta1 ** step)) / (np.sqrt(v_p / (1 - beta2 ** step)) + 1e-8)
+        if (epoch + 1) % 5 == 0 or epoch == 0:
+            print(f"epoch {epoch + 1:>3}: weighted mse {total / w.sum():.5f}")
+
+
+def spearman(a, b):
+    ra, rb = np.argsort(np.argsort(a)), np.argsort(np.argsort(b))
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def evaluate(model, lab_a, lab_b, y, name):
+    start = time.perf_counter()
+    pred = model.predict(lab_a, lab_b)
+    elapsed = time.perf_counter() - start
+    stars_off = np.abs(model.to_rating(pred) - model.to_rating(y))
+    print(
+        f"{name}: n={len(y)} mae={np.abs(pred - y).mean():.4f} rmse={np.sqrt(((pred - y) ** 2).mean()):.4f} "
+        f"spearman={spearman(pred, y):.4f} within-0.5-stars={(stars_off <= 0.5).mean():.1%} "
+        f"({len(y) / elapsed:,.0f} pairs/s)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=200_000, help="generated training pairs")
+    parser.add_argument("--neutral-share", type=float, default=0.3)
+    parser.add_argument("--labels", help="optional CSV of human labels: hex_a,hex_b,score")
+    parser.add_argument("--label-weight", type=float, default=5.0)
+    parser.add_argument("--hidden", type=int, nargs="+", default=[32, 16])
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--lr", type=float, default=3e-3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=MODEL_PATH)
+    parser.add_argument("--eval-only", action="store_true", help="evaluate --out on fresh pairs without training")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    lab_a, lab_b, y = generated_pairs(rng, args.pairs, args.neutral_share)
+    w = np.ones(len(y))
+    if args.labels:
+        la, lb, ly = labeled_pairs(args.labels)
+        lab_a, lab_b = np.concatenate([lab_a, la]), np.concatenate([lab_b, lb])
+        y, w = np.concatenate([y, ly]), np.concatenate([w, np.full(len(ly), args.label_weight)])
+
+    order = rng.permutation(len(y))
+    split = int(len(y) * 0.9)
+    train_idx, test_idx = order[:split], order[split:]
+
+    if args.eval_only:
+        model = ColorCompatModel.load(args.out)
+    else:
+        x = pair_features(lab_a[train_idx], lab_b[train_idx])
+        model = init_model(rng, x, args.hidden)
+        train(model, x, y[train_idx], w[train_idx], args.epochs, args.batch_size, args.lr, rng)
+        model.meta = {"pairs": len(train_idx), "seed": args.seed, "labels": args.labels or ""}
+        model.save(args.out)
+        print(f"saved {args.out}")
+
+    evaluate(model, lab_a[test_idx], lab_b[test_idx], y[test_idx], "held-out (agreement with labels)")
+    if args.labels:
+        labeled = test_idx[w[test_idx] > 1]
+        if len(labeled):
+            evaluate(model, lab_a[labeled], lab_b[labeled], y[labeled], "held-out human labels")
+
+
+if __name__ == "__main__":
+    main()